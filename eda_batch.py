@@ -0,0 +1,126 @@
+"""Mode batch/headless: hitung semua insight dashboard tanpa Streamlit.
+
+Contoh:
+    python eda_batch.py ecommerce.csv --out results
+    python eda_batch.py exports/*.csv --out results --workers 4 --format json parquet
+    python eda_batch.py ecommerce.csv --country "United Kingdom" --from 2011-01-01 --to 2011-06-30
+    python eda_batch.py ecommerce.csv --backend duckdb   # query langsung ke snapshot Parquet
+    python eda_batch.py ecommerce.csv --rfm              # + RFM per pelanggan (rfm.csv / rfm.parquet)
+
+Tiap file input menghasilkan folder <out>/<nama file>/ berisi insights.json dan/atau
+satu file Parquet per tabel. Sekaligus menghangatkan snapshot Parquet di samping CSV,
+sehingga dashboard berikutnya langsung memuat snapshot (tanpa parse ulang).
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from eda_core import (
+    QUERY_BACKENDS, STREAM_MIN_BYTES, FilterIndex, build_customer_cube, customer_rfm, file_fingerprint,
+    load_locked, load_stream_aggregates, make_backend, rfm_segments, snapshot_path,
+)
+
+
+def run_pipeline(path, countries=None, d_from=None, d_to=None, backend="pandas", rfm=False):
+    """CLEAN & LOCK (+ cube) untuk satu CSV, lalu semua tabel insight untuk filter yang diberikan.
+
+    backend="duckdb" meng-query snapshot Parquet (locked, atau cube untuk file besar) langsung.
+    rfm=True menambah tabel "rfm" (per pelanggan) & "rfm_segments"; butuh baris locked,
+    jadi tidak tersedia untuk file besar (mode streaming).
+    """
+    stat = os.stat(path)
+    fingerprint = file_fingerprint(path, stat.st_size, stat.st_mtime_ns)
+    locked = None   # baris locked (hanya file kecil); dipakai RFM
+    if stat.st_size > STREAM_MIN_BYTES:
+        source, _ = load_stream_aggregates(path, fingerprint)
+        snap = snapshot_path(path, "cube")
+    else:
+        source = locked = load_locked(path, fingerprint)
+        snap = snapshot_path(path)
+    if backend != "pandas" and os.path.exists(snap):
+        source = snap
+    engine = make_backend(backend, source)
+    insights = {**engine.global_insights(), **engine.view_insights(countries, d_from, d_to)}
+    if rfm:
+        cells = build_customer_cube(locked) if locked is not None else None
+        table = None if cells is None else customer_rfm(FilterIndex(cells, date_col="Date")
+                                                        .select(countries, d_from, d_to))
+        insights["rfm_segments"] = rfm_segments(table)
+        insights["rfm"] = table
+    return fingerprint, insights
+
+
+def _as_frame(value):
+    if isinstance(value, pd.Series):
+        return value.rename_axis(value.index.name or "index").reset_index(name=value.name or "value")
+    if isinstance(value, pd.DataFrame):
+        # index posisi (hasil sort) dibuang; index label (mis. nama kolom di corr) dipertahankan
+        return value.reset_index(drop=value.index.name is None and pd.api.types.is_integer_dtype(value.index))
+    return pd.DataFrame([value])
+
+
+def write_results(insights, out_dir, formats=("json",), meta=None):
+    os.makedirs(out_dir, exist_ok=True)
+    insights = dict(insights)
+    rfm = insights.pop("rfm", None)   # satu baris per pelanggan: file sendiri, bukan di insights.json
+    if rfm is not None:
+        if "parquet" in formats:
+            rfm.to_parquet(os.path.join(out_dir, "rfm.parquet"), index=False)
+        else:
+            rfm.to_csv(os.path.join(out_dir, "rfm.csv"), index=False)
+    tables = {name: _as_frame(v) for name, v in insights.items() if v is not None}
+    if "json" in formats:
+        payload = {"meta": meta or {},
+                   "tables": {name: json.loads(t.to_json(orient="records", date_format="iso"))
+                              for name, t in tables.items()}}
+        with open(os.path.join(out_dir, "insights.json"), "w") as f:
+            json.dump(payload, f, indent=2)
+    if "parquet" in formats:
+        for name, t in tables.items():
+            t.to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+    return out_dir
+
+
+def process_file(path, out_root, formats=("json",), countries=None, d_from=None, d_to=None, backend="pandas",
+                 rfm=False):
+    fingerprint, insights = run_pipeline(path, countries, d_from, d_to, backend, rfm)
+    meta = {"source": os.path.abspath(path), "fingerprint": fingerprint, "backend": backend,
+            "countries": countries or [],
+            "date_from": str(d_from) if d_from else None, "date_to": str(d_to) if d_to else None}
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return write_results(insights, os.path.join(out_root, stem), formats, meta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hitung insight EDA e-commerce tanpa Streamlit.")
+    parser.add_argument("inputs", nargs="+", help="file CSV (skema sama dengan ecommerce.csv)")
+    parser.add_argument("--out", default="results", help="folder output (default: results)")
+    parser.add_argument("--format", nargs="+", choices=["json", "parquet"], default=["json"])
+    parser.add_argument("--workers", type=int, default=1, help="jumlah proses paralel antar file")
+    parser.add_argument("--country", action="append", help="filter Country (boleh berulang)")
+    parser.add_argument("--from", dest="d_from", type=lambda s: pd.Timestamp(s).date(), help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="d_to", type=lambda s: pd.Timestamp(s).date(), help="YYYY-MM-DD")
+    parser.add_argument("--backend", choices=sorted(QUERY_BACKENDS), default="pandas",
+                        help="mesin query agregasi (duckdb: pip install duckdb)")
+    parser.add_argument("--rfm", action="store_true", help="tambah segmentasi RFM per pelanggan")
+    args = parser.parse_args(argv)
+    if (args.d_from is None) != (args.d_to is None):
+        parser.error("--from dan --to harus diisi bersamaan")
+
+    job = dict(out_root=args.out, formats=args.format, countries=args.country,
+               d_from=args.d_from, d_to=args.d_to, backend=args.backend, rfm=args.rfm)
+    if args.workers > 1 and len(args.inputs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(process_file, path, **job) for path in args.inputs]
+            outputs = [f.result() for f in futures]
+    else:
+        outputs = [process_file(path, **job) for path in args.inputs]
+    for path, out in zip(args.inputs, outputs):
+        print(f"{path} -> {out}")
+
+
+if __name__ == "__main__":
+    main()
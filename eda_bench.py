@@ -0,0 +1,495 @@
+"""Generator data sintetis + benchmark skala untuk pipeline dashboard.
+
+Contoh:
+    python eda_bench.py --rows 10000 1000000              # tulis/append ke bench_results.jsonl
+    python eda_bench.py --rows 10000000 --no-memory       # tanpa tracemalloc (lebih cepat)
+    python eda_bench.py --rows 1000000 --baseline old.jsonl
+    python eda_bench.py --generate 1000000 --csv synthetic.csv
+    python eda_bench.py --memory-report ecommerce.csv     # MB per kolom: skema lama vs ringkas
+    python eda_bench.py --backends --rows 1000000 --threads 1 2 4 8
+    python eda_bench.py --rfm --rows 1000000 10000000 --customers 1000000
+    python eda_bench.py --basket --rows 100000 1000000 3000000
+
+Tiap tahap (load_csv, clean_rows, apply_outlier_filter, snapshot save/load, build_cube,
+filter, tiap insight, tiap render figur dan render dari FigureCache) diukur terpisah: waktu,
+puncak memori (tracemalloc), baris in/out. Hasil disimpan satu baris JSON per tahap agar regresi antar
+versi mudah dibandingkan.
+
+FilterIndex.select pada ~9,8 juta baris locked (1 CPU; dataset 1,25 juta baris sintetis x8):
+negara dominan (United Kingdom, ~91% baris) 0,1 ms, UK + 90 hari 0,2 ms, Germany/France + 90 hari
+0,2 ms (semuanya slice blok negara, tanpa copy); UK + Germany 26 ms (90 hari) / 146 ms (semua
+tanggal, concat dua blok). Sebelum blok per negara: UK 730 ms, UK + 90 hari 148 ms.
+
+--backends membandingkan backend query (pandas vs DuckDB): cek paritas semua tabel insight
+untuk beberapa filter, lalu waktu query per jumlah thread DuckDB.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+from eda_core import (
+    BASKET_MIN_SUPPORT, DATE_FORMAT, OUTLIER_COLS, SNAPSHOT_VERSION, DuckDBBackend, FilterIndex, PandasBackend,
+    PartitionStats, ProductTopK, StratifiedSample, apply_outlier_filter, basket_pairs, build_basket_lines,
+    build_cube, build_customer_cube, clean_and_lock, clean_rows, correlation, customer_rfm, load_csv, load_snapshot,
+    memory_report, merge_customer_cubes, monthly_revenue, overview, rfm_segments, save_snapshot, top_bundles,
+    top_countries, top_products, top_products_in_month, transactions_per_hour,
+)
+from eda_charts import (
+    FigureCache, plot_correlation, plot_monthly_revenue, plot_top_countries, plot_top_products,
+    plot_transactions_per_hour, render_image,
+)
+
+# ---------- Generator ----------
+COUNTRY_WEIGHTS = {
+    "United Kingdom": 0.89, "Germany": 0.018, "France": 0.016, "EIRE": 0.015, "Spain": 0.005,
+    "Netherlands": 0.005, "Belgium": 0.004, "Switzerland": 0.004, "Portugal": 0.003,
+    "Australia": 0.003, "Norway": 0.002, "Italy": 0.002, "Channel Islands": 0.002,
+    "Finland": 0.0015, "Cyprus": 0.0012, "Sweden": 0.001, "Unspecified": 0.001, "Austria": 0.001,
+    "Denmark": 0.001, "Japan": 0.001, "Poland": 0.0008, "USA": 0.0006, "Israel": 0.0006,
+    "Singapore": 0.0005, "Iceland": 0.0004, "Canada": 0.0004, "Greece": 0.0003, "Malta": 0.0003,
+    "United Arab Emirates": 0.0002, "Brazil": 0.0002,
+}
+_WORDS = ("HEART", "CHRISTMAS", "VINTAGE", "WOODEN", "GLASS", "T-LIGHT", "HOLDER", "BAG", "JUMBO",
+          "CAKE", "CASES", "SET", "BUNTING", "RED", "WHITE", "PINK", "RETROSPOT", "METAL", "SIGN",
+          "LANTERN", "CANDLE", "MUG", "TIN", "BOX", "PAPER", "CHAIN", "ORNAMENT", "HANGING", "JAM",
+          "JELLY", "MOULD", "WALLET", "FAIRY", "TEATIME", "GIFT", "TAGS", "SCANDINAVIAN", "FRAME")
+
+
+def default_n_products(n_rows):
+    # ~1.6K produk untuk 5K baris, ~20K untuk 1M, ~63K untuk 10M
+    return int(min(max(n_rows ** 0.5 * 20, 100), 400_000))
+
+
+def _catalog(n_products, rng):
+    codes = (10000 + rng.permutation(90000 * max(1, n_products // 90000 + 1))[:n_products]).astype(str)
+    suffix = rng.random(n_products) < 0.3
+    codes = np.where(suffix, np.char.add(codes, np.array(list("ABCDEFGHJKLMNPS"))[rng.integers(0, 15, n_products)]), codes)
+    words = np.array(_WORDS)[rng.integers(0, len(_WORDS), (n_products, 3))]
+    desc = np.char.add(np.char.add(np.char.add(words[:, 0], " "), np.char.add(words[:, 1], " ")), words[:, 2])
+    desc = np.char.add(np.char.add(desc, " "), np.arange(n_products).astype(str))   # nama unik per produk
+    trailing = rng.random(n_products) < 0.1
+    desc = np.where(trailing, np.char.add(desc, " "), desc)   # spasi di ujung -> diuji oleh hygiene
+    price = np.round(np.exp(rng.normal(0.9, 0.8, n_products)), 2)
+    return codes, desc, price
+
+
+def generate_transactions(n_rows, seed=0, n_products=None, cancel_rate=0.02, n_customers=None):
+    """DataFrame transaksi sintetis dengan skema ecommerce.csv (kolom & format sama persis)."""
+    rng = np.random.default_rng(seed)
+    n_products = n_products or default_n_products(n_rows)
+    codes, desc, base_price = _catalog(n_products, rng)
+
+    # ~20 baris per invoice; beberapa invoice adalah cancel ("C" + qty negatif)
+    n_invoices = max(n_rows // 20, 1)
+    invoice = np.sort(rng.integers(0, n_invoices, n_rows))
+    cancelled = rng.random(n_invoices) < cancel_rate
+    invoice_no = (536365 + invoice).astype(str)
+    invoice_no = np.where(cancelled[invoice], np.char.add("C", invoice_no), invoice_no)
+
+    # popularitas produk mengikuti Zipf
+    product = (rng.zipf(1.25, n_rows) - 1) % n_products
+    product = rng.permutation(n_products)[product]
+
+    # tanggal per invoice: 2010-12-01 .. 2011-12-09, jam puncak ~12:00, tanpa Sabtu
+    days = rng.integers(0, 374, n_invoices)
+    start = np.datetime64("2010-12-01")
+    weekday = (start + days).astype("datetime64[D]").view("int64") % 7   # 0 = Kamis
+    days = np.where(weekday == 2, days + 1, days)                         # Sabtu -> Minggu
+    minutes = np.clip(rng.normal(12.5 * 60, 2.2 * 60, n_invoices), 7 * 60, 20 * 60).astype(int)
+    stamp = start.astype("datetime64[m]") + days * 1440 + minutes
+    uniq, inverse = np.unique(stamp, return_inverse=True)
+    text = pd.DatetimeIndex(uniq).strftime(DATE_FORMAT).to_numpy()
+    invoice_date = text[inverse][invoice]
+
+    qty = rng.choice([1, 2, 3, 4, 6, 8, 10, 12, 24, 48], n_rows,
+                     p=[.3, .15, .08, .07, .1, .04, .06, .13, .05, .02])
+    bulk = rng.random(n_rows) < 0.01
+    qty = np.where(bulk, rng.integers(100, 5000, n_rows), qty)
+    qty = np.where(cancelled[invoice], -qty, qty)
+
+    price = base_price[product] * np.where(rng.random(n_rows) < 0.02, rng.uniform(1.5, 20, n_rows), 1)
+
+    customers = n_customers or max(n_invoices // 5, 1)
+    customer = (12346 + rng.integers(0, customers, n_invoices)).astype(float)
+    customer[rng.random(n_invoices) < 0.25] = np.nan
+
+    country_names = np.array(list(COUNTRY_WEIGHTS))
+    p = np.array(list(COUNTRY_WEIGHTS.values()))
+    country = country_names[rng.choice(len(p), n_invoices, p=p / p.sum())]
+
+    description = desc[product].astype(object)
+    description[rng.random(n_rows) < 0.003] = None
+
+    return pd.DataFrame({
+        "InvoiceNo": invoice_no, "StockCode": codes[product], "Description": description,
+        "Quantity": qty, "InvoiceDate": invoice_date, "UnitPrice": np.round(price, 2),
+        "CustomerID": customer[invoice], "Country": country[invoice],
+    })
+
+
+# ---------- Benchmark ----------
+def _rows(x):
+    if x is None or isinstance(x, (bytes, str)):   # gambar hasil render, bukan baris
+        return None
+    if isinstance(x, tuple):
+        return _rows(x[0])
+    return len(x) if hasattr(x, "__len__") else None
+
+
+def measure(records, name, fn, *args, memory=True, rows_in=None, **meta):
+    """Jalankan fn sekali untuk waktu, sekali lagi di bawah tracemalloc untuk puncak memori."""
+    t0 = time.perf_counter()
+    out = fn(*args)
+    seconds = time.perf_counter() - t0
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+    records.append({"stage": name, "seconds": round(seconds, 6),
+                    "peak_mb": round(peak_mb, 3) if peak_mb is not None else None,
+                    "rows_in": rows_in, "rows_out": _rows(out), **meta})
+    return out
+
+
+def _render(plot, *args, **kwargs):
+    return render_image(plot(*args, **kwargs))   # render penuh (format CHART_FORMAT), figure ditutup
+
+
+def run_benchmark(n_rows, seed=0, memory=True, workdir=None):
+    records = []
+    opts = {"memory": memory, "rows": n_rows, "seed": seed}
+    df = generate_transactions(n_rows, seed=seed)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, "synthetic.csv")
+        df.to_csv(path, index=False)
+        del df
+        raw = measure(records, "load_csv", load_csv, path, **opts)
+
+    # tiap tahap memakai hasil tahap sebelumnya; yang lama dilepas agar puncak memori wajar
+    clean = measure(records, "clean_rows", clean_rows, raw, rows_in=len(raw), **opts)
+    del raw
+    locked = measure(records, "apply_outlier_filter", apply_outlier_filter, clean, list(OUTLIER_COLS),
+                     rows_in=len(clean), **opts)
+    del clean
+    # cold start berikutnya: snapshot Parquet locked menggantikan load_csv + clean_rows + outlier
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        snap, key = os.path.join(tmp, "synthetic.locked.parquet"), {"version": SNAPSHOT_VERSION, "rows": n_rows}
+        measure(records, "snapshot_save", save_snapshot, locked, snap, key, rows_in=len(locked), **opts)
+        measure(records, "snapshot_load", load_snapshot, snap, key, rows_in=len(locked), **opts)
+
+    index = measure(records, "filter_index_rows", FilterIndex, locked, rows_in=len(locked), **opts)
+    lo, hi = index.date_bounds()
+    mid = lo + (hi - lo) / 3
+    d_from, d_to = mid.date(), (mid + pd.Timedelta(days=90)).date()
+    sizes = index.country_sizes()
+    top = sorted(sizes, key=sizes.get, reverse=True)[:2]   # dua negara terbesar
+    measure(records, "filter_rows_date", index.select, None, d_from, d_to, rows_in=len(locked), **opts)
+    measure(records, "filter_rows_country_date", index.select, top, d_from, d_to, rows_in=len(locked), **opts)
+    measure(records, "filter_rows_dominant", index.select, top[:1], None, None, rows_in=len(locked), **opts)
+    measure(records, "filter_rows_dominant_date", index.select, top[:1], d_from, d_to, rows_in=len(locked), **opts)
+    del index
+
+    cube = measure(records, "build_cube", build_cube, locked, rows_in=len(locked), **opts)
+    del locked
+    cube_index = measure(records, "filter_index_cube", FilterIndex, cube, "Date", rows_in=len(cube), **opts)
+    view = measure(records, "filter_cube_country_date", cube_index.select, top, d_from, d_to,
+                   rows_in=len(cube), **opts)
+    cube = cube_index.df
+
+    tables = {}
+    for name, fn, arg in [("overview", overview, cube), ("top5_view", top_countries, view),
+                          ("top_product_view", top_products, view), ("top_all", top_products, cube),
+                          ("trx_hour", transactions_per_hour, view), ("year_revenue", monthly_revenue, view),
+                          ("prod_nov", top_products_in_month, cube), ("corr", correlation, view)]:
+        tables[name] = measure(records, f"insight:{name}", fn, arg, rows_in=len(arg), **opts)
+    # korelasi & ringkasan ber-filter dari state partisi (hari x negara), bukan dari sel cube
+    stats = measure(records, "stats:build", PartitionStats, cube, rows_in=len(cube), **opts)
+    measure(records, "stats:corr_country_date", stats.correlation, top, d_from, d_to,
+            rows_in=len(stats.index.df), **opts)
+    measure(records, "stats:overview_country_date", stats.overview, top, d_from, d_to,
+            rows_in=len(stats.index.df), **opts)
+    # mode preview: sampel berstrata (Country x bulan) dibangun sekali, lalu estimasi grafik 1-4 + CI
+    sample = measure(records, "preview:build", StratifiedSample, cube, rows_in=len(cube), **opts)
+    measure(records, "preview:view_country_date", sample.view_insights, top, d_from, d_to,
+            rows_in=len(sample.index.df), **opts)
+    exact4 = lambda v: [fn(v) for fn in (top_countries, top_products, transactions_per_hour, monthly_revenue)]
+    measure(records, "exact:view_country_date", lambda: exact4(cube_index.select(top, d_from, d_to)),
+            rows_in=len(cube), **opts)
+    # drill-down produk per bulan: struktur dibangun sekali, lalu top-K per bulan (exact & Space-Saving)
+    for mode, capacity in [("exact", None), ("approx", 1000)]:
+        topk = measure(records, f"topk_build:{mode}", ProductTopK.from_frame, cube, capacity,
+                       rows_in=len(cube), **opts)
+        measure(records, f"topk_month:{mode}", lambda t: t.top(10, month=11), topk, **opts)
+        measure(records, f"topk_all:{mode}", lambda t: t.top(10), topk, **opts)
+
+    charts = FigureCache()
+    for name, plot, kwargs in [("top5_view", plot_top_countries, {}),
+                               ("top_product_view", plot_top_products, {}),
+                               ("trx_hour", plot_transactions_per_hour, {}),
+                               ("year_revenue", plot_monthly_revenue, {}),
+                               ("prod_nov", plot_top_products, {"title": "Top Products — November",
+                                                                "figsize": (10, 6), "x_margin": None}),
+                               ("corr", plot_correlation, {})]:
+        if tables[name] is not None and len(tables[name]):
+            measure(records, f"render:{name}", lambda t, p=plot, kw=kwargs: _render(p, t, **kw),
+                    tables[name], **opts)
+            charts.image(name, plot, tables[name], **kwargs)
+            # rerun dengan input sama: hash tabel + lookup LRU
+            measure(records, f"render_cached:{name}",
+                    lambda t, n=name, p=plot, kw=kwargs: charts.image(n, p, t, **kw), tables[name], **opts)
+    return records
+
+
+RFM_CHUNK_ROWS = 2_000_000   # data sintetis dibuat per chunk: 10M baris object sekaligus tidak muat di RAM kecil
+
+def run_rfm_benchmark(n_rows, seed=0, memory=True, n_customers=None, partitions=4):
+    """RFM per pelanggan: customer cube dari baris locked, lalu RFM penuh, paralel per partisi & ber-filter."""
+    records = []
+    opts = {"memory": memory, "rows": n_rows, "seed": seed}
+    chunks = []   # baris locked (skema ringkas) per chunk; pelanggan sama lintas chunk
+    for i, start in enumerate(range(0, n_rows, RFM_CHUNK_ROWS)):
+        raw = generate_transactions(min(RFM_CHUNK_ROWS, n_rows - start), seed=seed + i,
+                                    n_customers=n_customers or max(n_rows // 100, 1))
+        chunks.append(apply_outlier_filter(clean_rows(raw), list(OUTLIER_COLS)))
+        del raw
+    cells = measure(records, "rfm:customer_cube",
+                    lambda parts: merge_customer_cubes([build_customer_cube(p) for p in parts]), chunks,
+                    rows_in=sum(map(len, chunks)), **opts)
+    del chunks
+    index = measure(records, "rfm:filter_index", FilterIndex, cells, "Date", rows_in=len(cells), **opts)
+    cells = index.df
+    opts["customers"] = int(cells["CustomerID"].nunique())
+
+    rfm = measure(records, "rfm:vectorized", customer_rfm, cells, rows_in=len(cells), **opts)
+    with ThreadPoolExecutor(max_workers=partitions) as pool:
+        parallel = measure(records, f"rfm:partitioned_{partitions}",
+                           lambda c: customer_rfm(c, executor=pool, partitions=partitions, min_cells=0), cells,
+                           rows_in=len(cells), **opts)
+    if not parallel.equals(rfm):
+        raise AssertionError("RFM partisi paralel beda dari RFM tervektor")
+
+    lo, hi = index.date_bounds()
+    sizes = index.country_sizes()
+    top = sorted(sizes, key=sizes.get, reverse=True)[:2]
+    d_from, d_to = (hi - pd.Timedelta(days=180)).date(), hi.date()
+    view = measure(records, "rfm:filter_country_date", index.select, top, d_from, d_to, rows_in=len(cells), **opts)
+    measure(records, "rfm:filtered", customer_rfm, view, rows_in=len(view), **opts)
+    measure(records, "rfm:segments", rfm_segments, rfm, rows_in=len(rfm), **opts)
+    return records
+
+
+def run_basket_benchmark(n_rows, seed=0, memory=True, min_supports=(BASKET_MIN_SUPPORT, 0.01)):
+    """Market basket: baris (invoice, produk) unik, lalu pasangan via X^T X sparse (penuh & ber-filter)."""
+    records = []
+    opts = {"memory": memory, "rows": n_rows, "seed": seed}
+    locked = apply_outlier_filter(clean_rows(generate_transactions(n_rows, seed=seed)), list(OUTLIER_COLS))
+    lines = measure(records, "basket:lines", build_basket_lines, locked, rows_in=len(locked), **opts)
+    del locked
+    index = measure(records, "basket:filter_index", FilterIndex, lines, "Date", rows_in=len(lines), **opts)
+    opts["invoices"] = int(lines["InvoiceNo"].nunique())
+    del lines
+
+    lo, hi = index.date_bounds()
+    sizes = index.country_sizes()
+    top = sorted(sizes, key=sizes.get, reverse=True)[:2]
+    view = index.select(top, (hi - pd.Timedelta(days=90)).date(), hi.date())
+    for ms in min_supports:
+        pairs = measure(records, f"basket:pairs@{ms:g}", basket_pairs, index.df, "Description", ms,
+                        rows_in=len(index.df), **opts)
+        measure(records, f"basket:pairs_filtered@{ms:g}", basket_pairs, view, "Description", ms,
+                rows_in=len(view), **opts)
+        measure(records, f"basket:top_bundles@{ms:g}", top_bundles, pairs, rows_in=len(pairs), **opts)
+    return records
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "pandas": pd.__version__,
+            "numpy": np.__version__, "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(records, baseline_path, threshold=1.25):
+    """Cetak tahap yang lebih lambat dari baseline (rasio > threshold) untuk ukuran data yang sama."""
+    with open(baseline_path) as f:
+        base = {(r["stage"], r["rows"]): r for r in map(json.loads, f)}
+    slower = []
+    for r in records:
+        b = base.get((r["stage"], r["rows"]))
+        if b and b["seconds"] > 0 and r["seconds"] / b["seconds"] > threshold:
+            slower.append((r["stage"], r["rows"], b["seconds"], r["seconds"]))
+    for stage, rows, old, new in slower:
+        print(f"REGRESSION {stage} @ {rows:,} rows: {old:.4f}s -> {new:.4f}s ({new / old:.2f}x)")
+    return slower
+
+
+# ---------- Backend query: paritas & skala thread ----------
+def tables_equal(a, b, rtol=1e-9):
+    """Tabel insight sama: kolom, urutan baris & label identik; angka sama s.d. pembulatan float."""
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(np.isclose(a[k], b[k], rtol=rtol) for k in a)
+    if isinstance(a, pd.Series):
+        return (list(a.index) == list(b.index) and a.dtype.kind == b.dtype.kind
+                and np.allclose(a.to_numpy(float), b.to_numpy(float), rtol=rtol, equal_nan=True))
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    for c in a.columns:
+        if pd.api.types.is_numeric_dtype(a[c]):
+            # jenis angka (integer vs float) ikut dibandingkan: SUM integer yang pulang sebagai float = beda
+            if a[c].dtype.kind != b[c].dtype.kind:
+                return False
+            if not np.allclose(a[c].to_numpy(float), b[c].to_numpy(float), rtol=rtol, equal_nan=True):
+                return False
+        elif not (a[c].astype(str).to_numpy() == b[c].astype(str).to_numpy()).all():
+            return False
+    return True
+
+def bench_filters(index, n=8, seed=0):
+    """Kombinasi filter acak (negara + rentang tanggal) yang dipakai untuk paritas & timing."""
+    rng = np.random.default_rng(seed)
+    lo, hi = index.date_bounds()
+    days = max((hi - lo).days, 1)
+    sizes = index.country_sizes()
+    big = sorted(sizes, key=sizes.get, reverse=True)
+    filters = [(None, None, None)]
+    for _ in range(n - 1):
+        k = int(rng.integers(0, 4))
+        countries = list(rng.choice(big[:10], size=min(k, len(big[:10])), replace=False)) or None
+        start = lo + pd.Timedelta(days=int(rng.integers(0, days)))
+        end = min(start + pd.Timedelta(days=int(rng.integers(7, 180))), hi)
+        filters.append((countries, start.date(), end.date()))
+    return filters
+
+def backend_parity(reference, other, filters):
+    """Daftar (filter, tabel) yang berbeda antara dua backend; kosong = paritas penuh."""
+    diffs = []
+    ref, got = reference.global_insights(), other.global_insights()
+    diffs += [("global", k) for k in ref if not tables_equal(ref[k], got[k])]
+    for f in filters:
+        ref, got = reference.view_insights(*f), other.view_insights(*f)
+        diffs += [(f, k) for k in ref if not tables_equal(ref[k], got[k])]
+    return diffs
+
+def run_backend_benchmark(n_rows, seed=0, threads=(1,), repeat=3, workdir=None):
+    """pandas (cube di memori) vs DuckDB (snapshot Parquet locked, tanpa cube) per jumlah thread."""
+    records = []
+    locked = apply_outlier_filter(clean_rows(generate_transactions(n_rows, seed=seed)), list(OUTLIER_COLS))
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        snap = os.path.join(tmp, "locked.parquet")
+        locked.to_parquet(snap, index=False)
+
+        t0 = time.perf_counter()
+        pandas = PandasBackend(locked)   # termasuk build_cube + FilterIndex
+        setup = {"pandas": time.perf_counter() - t0}
+        filters = bench_filters(pandas.index, seed=seed)
+        del locked
+
+        def query_all(backend):
+            backend.global_insights()
+            for f in filters:
+                backend.view_insights(*f)
+
+        backends = [("pandas", None, pandas)]
+        for k in threads:
+            t0 = time.perf_counter()
+            backends.append(("duckdb", k, DuckDBBackend(snap, threads=k)))
+            setup[f"duckdb:{k}"] = time.perf_counter() - t0
+        for name, k, backend in backends:
+            if name != "pandas":
+                diffs = backend_parity(pandas, backend, filters)
+                if diffs:
+                    raise AssertionError(f"duckdb ({k} thread) beda dari pandas: {diffs[:5]}")
+            query_all(backend)   # pemanasan (cache metadata Parquet, JIT pandas)
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                query_all(backend)
+            seconds = (time.perf_counter() - t0) / repeat
+            records.append({"stage": f"backend:{name}" + (f":{k}t" if k else ""), "rows": n_rows, "seed": seed,
+                            "threads": k, "queries": len(filters) + 1, "seconds": round(seconds, 6),
+                            "setup_seconds": round(setup[name if k is None else f"{name}:{k}"], 6),
+                            "parity": True})
+    return records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline EDA e-commerce pada data sintetis.")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.jsonl", help="file JSON Lines (di-append)")
+    parser.add_argument("--no-memory", action="store_true", help="lewati pengukuran tracemalloc")
+    parser.add_argument("--baseline", help="JSON Lines dari versi sebelumnya untuk dibandingkan")
+    parser.add_argument("--generate", type=int, help="hanya tulis CSV sintetis dengan N baris")
+    parser.add_argument("--csv", default="synthetic.csv", help="path output untuk --generate")
+    parser.add_argument("--memory-report", metavar="CSV", help="hanya cetak laporan memori dataset locked")
+    parser.add_argument("--backends", action="store_true", help="paritas & waktu backend query pandas vs DuckDB")
+    parser.add_argument("--rfm", action="store_true", help="benchmark RFM pelanggan (bukan pipeline dashboard)")
+    parser.add_argument("--basket", action="store_true", help="benchmark market basket (pasangan produk)")
+    parser.add_argument("--customers", type=int, help="jumlah pelanggan sintetis (default: invoice / 5)")
+    parser.add_argument("--threads", nargs="+", type=int, default=None,
+                        help="jumlah thread DuckDB untuk --backends (default: 1..jumlah CPU)")
+    args = parser.parse_args(argv)
+
+    if args.backends:
+        cpus = os.cpu_count() or 1
+        threads = args.threads or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+        env, records = _environment(), []
+        for n in args.rows:
+            for r in run_backend_benchmark(n, seed=args.seed, threads=threads):
+                records.append({**env, **r})
+                print(f"{n:>12,}  {r['stage']:<20} {r['seconds']:>9.4f}s / {r['queries']} filter"
+                      f"  (setup {r['setup_seconds']:.2f}s, paritas OK)")
+        with open(args.out, "a") as f:
+            for r in records:
+                f.write(json.dumps(r) + "\n")
+        return
+
+    if args.memory_report:
+        report = memory_report(clean_and_lock(load_csv(args.memory_report)))
+        print(report.to_string(index=False, float_format=lambda x: f"{x:,.3f}"))
+        return
+
+    if args.generate:
+        generate_transactions(args.generate, seed=args.seed).to_csv(args.csv, index=False)
+        print(f"{args.generate:,} rows -> {args.csv}")
+        return
+
+    env = _environment()
+    records = []
+    for n in args.rows:
+        if args.rfm:
+            runs = run_rfm_benchmark(n, seed=args.seed, memory=not args.no_memory, n_customers=args.customers)
+        elif args.basket:
+            runs = run_basket_benchmark(n, seed=args.seed, memory=not args.no_memory)
+        else:
+            runs = run_benchmark(n, seed=args.seed, memory=not args.no_memory)
+        for r in runs:
+            records.append({**env, **r})
+            print(f"{n:>12,}  {r['stage']:<32} {r['seconds']:>9.4f}s"
+                  + (f"  {r['peak_mb']:>9.1f} MB" if r["peak_mb"] is not None else ""))
+    with open(args.out, "a") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+    if args.baseline:
+        compare(records, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2009 @@
+"""Logika data EDA e-commerce tanpa Streamlit.
+
+CLEAN & LOCK, filter index, cube agregat, ingestion streaming, snapshot Parquet,
+append store dan tabel insight. Dipakai oleh dashboard (eda_ecommerce.py) dan
+mode batch (eda_batch.py).
+"""
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATE_FORMAT = "%m/%d/%Y %H:%M"   # format InvoiceDate di ecommerce.csv, mis. 5/25/2011 17:31
+OUTLIER_COLS = ("Quantity", "UnitPrice")
+OUTLIER_MODE = "sequential"   # atau "independent" (lihat outlier_mask)
+OUTLIER_BY = None             # mis. {"UnitPrice": "StockCode"}: IQR harga per produk
+MONTH_MAP = {1:"January",2:"February",3:"March",4:"April",5:"May",6:"June",7:"July",8:"August",9:"September",10:"October",11:"November",12:"December"}
+DAY_MAP = {0:"Monday",1:"Tuesday",2:"Wednesday",3:"Thursday",4:"Friday",5:"Saturday",6:"Sunday"}
+CATEGORY_COLS = ["InvoiceNo", "StockCode", "Description", "Country"]   # teks berulang -> dictionary-encoded
+
+def load_csv(path_or_file):
+    return pd.read_csv(path_or_file, encoding_errors="ignore")
+
+def csv_shape(path):
+    """(baris, kolom) file CSV mentah tanpa parsing: hitung newline per blok biner."""
+    columns = len(pd.read_csv(path, encoding_errors="ignore", nrows=0).columns)
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    lines += last != b"\n"   # baris terakhir tanpa newline
+    return max(lines - 1, 0), columns
+
+def file_fingerprint(path, size=None, mtime_ns=None):
+    # hash isi file; size & mtime: jalan pintas lewat snapshot & kunci cache di app (tidak dibaca ulang tiap rerun)
+    if size is not None:
+        for kind in ("locked", "cube"):   # mode biasa: snapshot locked; mode streaming: hanya snapshot cube
+            meta = snapshot_meta(snapshot_path(path, kind))
+            if meta and meta.get("size") == size and meta.get("mtime_ns") == mtime_ns:
+                return meta["fingerprint"]   # cold start: pakai hash yang tercatat di snapshot
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _group_col(by, col):
+    # by: None (global), nama kolom grup untuk semua kolom, atau dict {kolom: kolom grup}
+    return by.get(col) if isinstance(by, dict) else by
+
+def iqr_bounds(s, group=None):
+    """Batas IQR (lo, hi): skalar, atau Series per grup bila group diberikan (NaN diabaikan)."""
+    if group is None:
+        q1, q3 = s.quantile(0.25), s.quantile(0.75)
+    else:
+        g = s.groupby(group, dropna=False)
+        q1, q3 = g.quantile(0.25), g.quantile(0.75)
+    iqr = q3 - q1
+    return q1 - 1.5*iqr, q3 + 1.5*iqr
+
+def within_bounds(s, lo, hi, group=None):
+    if group is not None:
+        # map pada kolom categorical bisa menghasilkan categorical -> paksa float agar bisa dibandingkan
+        lo, hi = group.map(lo).astype(float), group.map(hi).astype(float)
+    return (s >= lo) & (s <= hi)
+
+def outlier_mask(df, cols, mode="sequential", by=None):
+    """Mask gabungan baris yang lolos IQR untuk semua cols, tanpa salinan frame di tengah.
+
+    mode="sequential": IQR kolom berikutnya dihitung dari baris yang lolos kolom sebelumnya
+    (perilaku lama, urutan cols berpengaruh). mode="independent": tiap IQR dari semua baris.
+    by: IQR per grup (mis. "StockCode" atau {"UnitPrice": "StockCode"}).
+    """
+    if mode not in ("sequential", "independent"):
+        raise ValueError(f"Unknown outlier mode: {mode!r}")
+    mask = pd.Series(True, index=df.index)
+    for c in cols:
+        if c not in df.columns:
+            continue
+        s = pd.to_numeric(df[c], errors="coerce")
+        gcol = _group_col(by, c)
+        group = df[gcol] if gcol else None
+        lo, hi = iqr_bounds(s.where(mask) if mode == "sequential" else s, group)
+        mask &= within_bounds(s, lo, hi, group)
+    return mask
+
+def apply_outlier_filter(df, cols, mode="sequential", by=None):
+    return df[outlier_mask(df, cols, mode=mode, by=by)]
+
+def as_category(s, normalize=None):
+    """Kolom teks -> categorical (kategori str terurut); normalize dijalankan per nilai unik, bukan per baris."""
+    codes, uniques = pd.factorize(s)
+    labels = pd.Index(uniques).astype(str)
+    if normalize is not None:
+        labels = normalize(labels)
+    cats = labels.unique().sort_values()
+    codes = np.where(codes >= 0, cats.get_indexer(labels)[codes] if len(labels) else -1, -1)
+    return pd.Series(pd.Categorical.from_codes(codes, cats), index=s.index, name=s.name)
+
+def sort_categories(df):
+    """Kategori diurutkan ulang (mis. setelah dictionary beberapa part Parquet digabung)."""
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) and not df[c].cat.categories.is_monotonic_increasing:
+            df[c] = df[c].cat.reorder_categories(df[c].cat.categories.sort_values())
+    return df
+
+def cancelled_flag(invoice):
+    """True untuk retur/cancel (InvoiceNo berawalan "C"); dicek sekali per nomor unik."""
+    codes, uniques = pd.factorize(invoice)
+    is_cancel = pd.Index(uniques).astype(str).str.startswith("C")
+    return pd.Series(np.append(is_cancel, False)[codes], index=invoice.index)   # -1 (NaN) -> False
+
+def _small_int(s, dtype):
+    # bagian tanggal dari NaT -> NaN: pakai tipe nullable hanya bila perlu
+    return s.astype(dtype) if s.notna().all() else s.astype(dtype.capitalize())
+
+def parse_dates(values, date_format=DATE_FORMAT):
+    """Parse tanggal dengan date_format (cepat); nilai yang tidak cocok (mis. ISO dari export lain)
+    dicoba lagi dengan inferensi format per nilai, bukan langsung NaT."""
+    out = pd.to_datetime(values, format=date_format, errors="coerce")
+    miss = out.isna() & values.notna()
+    if miss.any():
+        # utc=True: campuran offset tetap satu dtype; nilai tanpa zona tidak bergeser
+        retry = pd.to_datetime(values[miss], format="mixed", errors="coerce", utc=True).dt.tz_convert(None)
+        out[miss] = retry.astype(out.dtype)
+    return out
+
+def clean_rows(df, date_format=DATE_FORMAT):
+    """CLEAN per baris: tipe data, kolom turunan, buang retur/cancel (tanpa outlier).
+
+    Skema ringkas: teks berulang categorical, bagian tanggal int kecil (nama bulan/hari
+    diturunkan saat ditampilkan), Quantity int32 (float32 bila ada nilai pecahan),
+    UnitPrice & Revenue float32.
+    """
+    df = df.copy()
+
+    # LOCK: remove returns/cancellations (flag dihitung sekali saat ingest, dari nomor unik)
+    if "InvoiceNo" in df.columns:
+        df = df[~cancelled_flag(df["InvoiceNo"])]
+
+    # Numerik & revenue
+    if "Quantity" in df.columns:
+        df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce")
+    if "UnitPrice" in df.columns:
+        df["UnitPrice"] = pd.to_numeric(df["UnitPrice"], errors="coerce")
+    if "Revenue" not in df.columns:
+        if {"UnitPrice", "Quantity"}.issubset(df.columns):
+            df["Revenue"] = df["UnitPrice"] * df["Quantity"]   # float64 dulu, baru di-downcast
+        else:
+            raise ValueError("Need UnitPrice & Quantity to compute Revenue.")
+
+    # Description hygiene
+    if "Description" in df.columns:
+        df = df[df["Description"].notna()]
+    if "Quantity" in df.columns:
+        df = df[df["Quantity"] > 0]
+    df = df.copy()
+
+    # Datetime fields
+    if "InvoiceDate" in df.columns:
+        df["InvoiceDate"] = parse_dates(df["InvoiceDate"], date_format)
+        dt = df["InvoiceDate"].dt
+        df["Month"] = _small_int(dt.month, "int8")
+        df["Year"] = _small_int(dt.year, "int16")
+        df["Hour"] = _small_int(dt.hour, "int8")
+        df["DayOfWeek"] = _small_int(dt.dayofweek, "int8")   # 0 = Monday, lihat DAY_MAP
+
+    # Skema ringkas: tipe tetap (bukan downcast per data) agar stabil lintas chunk/batch
+    if "Quantity" in df.columns:
+        q = df["Quantity"]
+        df["Quantity"] = q.astype("int32") if q.notna().all() and (q % 1 == 0).all() else q.astype("float32")
+    for c in ("UnitPrice", "Revenue"):
+        if c in df.columns and pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = df[c].astype("float32")
+    for c in CATEGORY_COLS:
+        if c in df.columns:
+            if c == "Country":
+                df[c] = as_category(df[c], lambda v: v.where(v != "Unspecified", "United Kingdom"))
+            elif c == "Description":
+                df[c] = as_category(df[c], lambda v: v.str.strip())
+            else:
+                df[c] = as_category(df[c])
+    return df
+
+def legacy_schema(df):
+    """Representasi lama (teks object, numerik 64-bit, nama bulan/hari per baris) untuk laporan memori."""
+    out = df.copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+        elif pd.api.types.is_float_dtype(out[c]):
+            out[c] = out[c].astype("float64")
+        elif pd.api.types.is_integer_dtype(out[c]):
+            out[c] = out[c].astype("float64" if out[c].isna().any() else "int64")
+    if "InvoiceDate" in out.columns:
+        out["DayOfWeek_Name"] = out["InvoiceDate"].dt.day_name().astype(object)
+    if "Month" in out.columns:
+        out["Month_Name"] = out["Month"].map(MONTH_MAP).astype(object)
+    return out.drop(columns=["DayOfWeek"], errors="ignore")
+
+def memory_report(df, before=None):
+    """MB per kolom (deep) skema lama vs skema ringkas, plus baris TOTAL."""
+    before = legacy_schema(df) if before is None else before
+    cols = list(dict.fromkeys([*before.columns, *df.columns]))
+    mb = lambda frame: frame.memory_usage(index=False, deep=True) / 1024**2
+    report = pd.DataFrame({
+        "column": cols,
+        "dtype_before": [str(before[c].dtype) if c in before else "–" for c in cols],
+        "mb_before": mb(before).reindex(cols, fill_value=0.0).to_numpy(),
+        "dtype_after": [str(df[c].dtype) if c in df else "–" for c in cols],
+        "mb_after": mb(df).reindex(cols, fill_value=0.0).to_numpy(),
+    })
+    total = {"column": "TOTAL", "dtype_before": "", "mb_before": report["mb_before"].sum(),
+             "dtype_after": "", "mb_after": report["mb_after"].sum()}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    report["ratio"] = report["mb_after"] / report["mb_before"].where(report["mb_before"] > 0)
+    return report
+
+def clean_and_lock(df, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS,
+                   outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY):
+    """CLEAN & LOCK: tipe data, kolom turunan, buang retur/cancel & outlier (IQR)."""
+    df = clean_rows(df, date_format=date_format)
+    return lock_rows(df, outlier_cols=outlier_cols, outlier_mode=outlier_mode, outlier_by=outlier_by)
+
+def lock_rows(df, outlier_cols=OUTLIER_COLS, outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY):
+    """LOCK baris hasil clean_rows: remove outliers (IQR) on Quantity & UnitPrice (global atau per grup)."""
+    cols_for_outlier = [c for c in outlier_cols if c in df.columns]
+    if not cols_for_outlier:
+        return df
+    return apply_outlier_filter(df, cols_for_outlier, mode=outlier_mode, by=outlier_by)
+
+# ---------- Snapshot kolumnar (Parquet) dari dataset locked ----------
+SNAPSHOT_VERSION = 3   # naikkan bila logika CLEAN & LOCK atau skema berubah
+
+def snapshot_path(path, kind="locked"):
+    root, _ = os.path.splitext(path)
+    return f"{root}.{kind}.parquet"
+
+def snapshot_meta(snap):
+    """Metadata snapshot (sumber & parameter cleaning) tanpa membaca datanya."""
+    try:
+        raw = pq.read_schema(snap).metadata or {}
+    except (OSError, pa.ArrowException):
+        return None
+    return json.loads(raw[b"eda_snapshot"]) if b"eda_snapshot" in raw else None
+
+def snapshot_key(path, fingerprint, date_format, outlier_cols, outlier_mode=OUTLIER_MODE,
+                 outlier_by=OUTLIER_BY, **params):
+    st_ = os.stat(path)
+    return {"version": SNAPSHOT_VERSION, "size": st_.st_size, "mtime_ns": st_.st_mtime_ns,
+            "fingerprint": fingerprint, "date_format": date_format, "outlier_cols": list(outlier_cols),
+            "outlier_mode": outlier_mode, "outlier_by": outlier_by, **params}
+
+def snapshot_is_fresh(meta, key):
+    # size/mtime hanya jalan pintas untuk fingerprint; yang menentukan: isi file & parameter
+    ignore = {"size", "mtime_ns"}
+    return meta is not None and all(meta.get(k) == v for k, v in key.items() if k not in ignore)
+
+def load_snapshot(snap, key):
+    """DataFrame dari snapshot (memory-mapped) bila masih valid untuk key, selain itu None."""
+    if not snapshot_is_fresh(snapshot_meta(snap), key):
+        return None
+    return pq.read_table(snap, memory_map=True).to_pandas()
+
+def save_snapshot(df, snap, key):
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b"eda_snapshot": json.dumps(key).encode()})
+        tmp = f"{snap}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, snap)   # atomic: proses lain tidak pernah membaca snapshot setengah jadi
+    except (OSError, pa.ArrowException):
+        pass   # snapshot hanya optimasi; folder read-only atau tipe campuran -> lewati
+
+def load_locked(path, fingerprint, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS,
+                outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY):
+    """df_locked untuk file CSV: dari snapshot bila masih valid, selain itu CLEAN & LOCK + simpan."""
+    snap = snapshot_path(path)
+    key = snapshot_key(path, fingerprint, date_format, outlier_cols, outlier_mode, outlier_by)
+    df = load_snapshot(snap, key)
+    if df is None:
+        df = clean_and_lock(load_csv(path), date_format=date_format, outlier_cols=outlier_cols,
+                            outlier_mode=outlier_mode, outlier_by=outlier_by)
+        save_snapshot(df, snap, key)
+    return df
+
+class FilterIndex:
+    """Index filter Country/Date untuk satu dataset locked (dibangun sekali).
+
+    Baris diurutkan per kolom tanggal sehingga rentang tanggal = binary search (slice).
+    Salinan kedua diurutkan per (Country, tanggal): tiap negara satu blok, jadi negara +
+    rentang tanggal = dua binary search dalam bloknya lalu slice tanpa copy, juga untuk
+    negara dominan (mis. UK ~90% baris). Memori ~2x dataset, ditukar dengan select O(log n).
+    Dipakai untuk baris mentah (InvoiceDate) maupun sel cube (Date).
+    """
+
+    def __init__(self, df, date_col="InvoiceDate"):
+        has_date = date_col in df.columns
+        self.df = (df.sort_values(date_col, kind="stable", na_position="last")
+                     .reset_index(drop=True)) if has_date else df.reset_index(drop=True)
+        all_dates = self.df[date_col].to_numpy("datetime64[ns]") if has_date else None
+        if has_date:
+            self.n_dated = int(self.df[date_col].notna().sum())   # NaT ada di ekor
+            self.dates = all_dates[:self.n_dated]
+        else:
+            self.n_dated, self.dates = 0, None
+
+        self.countries, self.blocks, self.by_country, self.country_dates = [], {}, None, None
+        if "Country" in self.df.columns:
+            country = self.df["Country"]
+            if not isinstance(country.dtype, pd.CategoricalDtype):   # categorical: langsung pakai kodenya
+                country = country.astype(str).where(country.notna())
+            codes, uniques = pd.factorize(country)
+            order = np.argsort(codes, kind="stable")            # posisi per kode, tetap urut tanggal
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            order = order[bounds[0]:]                            # Country kosong (kode -1) tidak punya blok
+            bounds = bounds - bounds[0]
+            self.by_country = self.df.take(order)
+            if has_date:
+                self.country_dates = all_dates[order]           # NaT di ekor tiap blok
+            self.blocks = {str(u): (int(bounds[i]), int(bounds[i + 1])) for i, u in enumerate(uniques)}
+            self.countries = sorted(self.blocks)
+
+    def date_bounds(self):
+        if not self.n_dated:
+            return None, None
+        return pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+
+    def country_sizes(self):
+        return {c: hi - lo for c, (lo, hi) in self.blocks.items()}
+
+    def select(self, countries=None, d_from=None, d_to=None):
+        """Baris untuk filter: slice (tanpa copy) bila hanya tanggal atau satu negara, concat blok bila beberapa negara."""
+        bounds = None
+        if d_from is not None and d_to is not None and self.dates is not None:
+            bounds = (np.datetime64(pd.Timestamp(d_from)), np.datetime64(pd.Timestamp(d_to) + pd.Timedelta(days=1)))
+        if not countries:
+            lo, hi = 0, len(self.df)
+            if bounds is not None:
+                lo, hi = (int(x) for x in np.searchsorted(self.dates, bounds, side="left"))
+            return self.df.iloc[lo:hi]
+        spans = []
+        for c in dict.fromkeys(map(str, countries)):
+            if c not in self.blocks:
+                continue
+            lo, hi = self.blocks[c]
+            if bounds is not None:
+                lo, hi = (lo + int(x) for x in np.searchsorted(self.country_dates[lo:hi], bounds, side="left"))
+            if hi > lo:
+                spans.append((lo, hi))
+        if len(spans) <= 1:
+            lo, hi = spans[0] if spans else (0, 0)
+            return self.by_country.iloc[lo:hi]
+        return pd.concat([self.by_country.iloc[lo:hi] for lo, hi in sorted(spans)])   # urutan tetap, apa pun urutan pilihan
+
+CUBE_KEYS = ["Date", "Hour", "Country", "Description"]
+CUBE_MEASURES = ["Quantity", "UnitPrice", "Revenue"]
+
+def build_cube(df):
+    """Pre-agregasi dataset locked per (Date, Hour, Country, Description).
+
+    Menyimpan jumlah tiap measure, jumlah baris (Count) dan jumlah kuadrat/cross-product
+    (mis. "Quantity*Revenue") sehingga korelasi bisa dihitung dari cube.
+    """
+    cells = pd.DataFrame(index=df.index)
+    if "InvoiceDate" in df.columns:
+        cells["Date"] = df["InvoiceDate"].dt.normalize()
+    for k in CUBE_KEYS[1:]:
+        if k in df.columns:
+            cells[k] = df[k]
+    keys = list(cells.columns)
+
+    measures = [m for m in CUBE_MEASURES if m in df.columns]
+    cells["Count"] = 1
+    for a in measures:   # akumulasi selalu 64-bit walau kolom locked di-downcast
+        cells[a] = df[a].astype("int64" if pd.api.types.is_integer_dtype(df[a]) else "float64")
+    for i, a in enumerate(measures):
+        for b in measures[i:]:
+            cells[f"{a}*{b}"] = cells[a] * cells[b]
+
+    cube = (cells.groupby(keys, dropna=False, sort=False, observed=True).sum().reset_index()
+            if keys else cells.sum().to_frame().T)
+    if "Date" in cube.columns:
+        cube["Year"] = cube["Date"].dt.year
+        cube["Month"] = cube["Date"].dt.month
+    return cube
+
+def cube_corr(cube, cols):
+    """Matriks korelasi Pearson dari jumlah & cross-product di cube (setara df[cols].corr()).
+
+    Seleksi kosong (Count == 0) -> DataFrame kosong, bukan matriks NaN.
+    """
+    n = cube["Count"].sum()
+    if n == 0:
+        return pd.DataFrame(columns=cols, dtype=float)
+    sums = {c: cube[c].sum() for c in cols}
+    def cross(a, b):
+        key = f"{a}*{b}" if f"{a}*{b}" in cube.columns else f"{b}*{a}"
+        return cube[key].sum() - sums[a] * sums[b] / n
+    corr = pd.DataFrame(index=cols, columns=cols, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):   # variansi 0 (mis. satu baris) -> NaN
+        for a in cols:
+            for b in cols:
+                corr.loc[a, b] = cross(a, b) / np.sqrt(cross(a, a) * cross(b, b))
+    return corr
+
+def merge_cubes(parts):
+    """Gabungkan beberapa cube parsial (mis. per chunk) menjadi satu cube.
+
+    Kunci categorical disatukan dulu (kategori gabungan) agar tidak jatuh ke object/str.
+    """
+    cube = concat_partitions([p.drop(columns=["Year", "Month"], errors="ignore") for p in parts])
+    keys = [k for k in CUBE_KEYS if k in cube.columns]
+    cube = cube.groupby(keys, dropna=False, sort=False, observed=True).sum().reset_index()
+    if "Date" in cube.columns:
+        cube["Year"] = cube["Date"].dt.year
+        cube["Month"] = cube["Date"].dt.month
+    return cube
+
+# ---------- Streaming ingestion (CSV lebih besar dari memori) ----------
+STREAM_MIN_BYTES = 512 * 1024**2   # file di atas ini dibaca per chunk
+STREAM_MEMORY_MB = 256             # batas memori kerja per chunk
+SAMPLE_SIZE = 1000                 # ukuran reservoir untuk "Sample rows"
+
+def chunk_rows_for_budget(path, memory_mb=STREAM_MEMORY_MB, probe_rows=1000):
+    """Jumlah baris per chunk agar satu chunk (termasuk salinan kerja) muat di memory_mb."""
+    probe = pd.read_csv(path, encoding_errors="ignore", nrows=probe_rows)
+    per_row = probe.memory_usage(deep=True).sum() / max(len(probe), 1)
+    # ~4 salinan hidup bersamaan: chunk mentah, hasil clean_rows, kolom turunan, sel cube
+    return max(int(memory_mb * 1024**2 / (4 * per_row)), 1000)
+
+def read_chunks(path, chunk_rows):
+    return pd.read_csv(path, encoding_errors="ignore", chunksize=chunk_rows)
+
+def accumulate_cubes(parts, batch_rows):
+    """Gabungkan cube parsial (iterable, mis. per chunk) tanpa me-merge ulang seluruh cube tiap part.
+
+    Part ditampung lalu di-merge per batch: merge baru jalan bila buffer >= cube (dan >= batch_rows),
+    jadi tiap sel ikut di-merge ulang O(log part) kali, bukan sekali per part.
+    """
+    cube, buffer, buffered = None, [], 0
+    for part in parts:
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= max(batch_rows, 0 if cube is None else len(cube)):
+            cube = merge_cubes(buffer if cube is None else [cube, *buffer])
+            buffer, buffered = [], 0
+    if buffer:
+        cube = merge_cubes(buffer if cube is None else [cube, *buffer])
+    return cube
+
+STREAM_APPROX_QUANTILES = False   # True: sketch KLL (memori tetap) alih-alih frekuensi nilai exact
+
+def weighted_quantile(values, weights, q, groups=None):
+    """Quantile linear (setara Series.quantile) dari nilai unik & frekuensinya.
+
+    Dengan groups: Series quantile per grup, dihitung dalam satu pass tervektor.
+    """
+    values, weights = np.asarray(values, dtype=float), np.asarray(weights, dtype=float)
+    if groups is None:
+        codes, uniques = np.zeros(len(values), dtype=np.intp), None
+    else:
+        codes, uniques = pd.factorize(pd.Series(groups), use_na_sentinel=False)
+    order = np.lexsort((values, codes))
+    v, w = values[order], weights[order]
+    cum = np.cumsum(w)
+    total = np.bincount(codes[order], weights=w)
+    start = np.concatenate([[0.0], np.cumsum(total)[:-1]])   # bobot sebelum tiap grup
+    h = (total - 1) * q
+    j = np.floor(h)
+    lo = v[np.searchsorted(cum, start + j, side="right")]
+    hi = v[np.searchsorted(cum, start + np.minimum(j + 1, total - 1), side="right")]
+    res = lo + (h - j) * (hi - lo)
+    return res[0] if groups is None else pd.Series(res, index=uniques)
+
+def _freq_bounds(freq, cols, mode, by, weight="n"):
+    """Batas IQR dari tabel frekuensi (nilai unik + bobot), semantik sama dengan outlier_mask."""
+    bounds, keep = [], np.ones(len(freq), dtype=bool)
+    for c in cols:
+        valid = freq[c].notna().to_numpy() & (keep if mode == "sequential" else True)
+        if not valid.any():
+            break
+        gcol = _group_col(by, c)
+        sub = freq[valid]
+        q1, q3 = (weighted_quantile(sub[c], sub[weight], q, sub[gcol] if gcol else None)
+                  for q in (0.25, 0.75))
+        iqr = q3 - q1
+        lo, hi = q1 - 1.5*iqr, q3 + 1.5*iqr
+        bounds.append((c, gcol, lo, hi))
+        keep &= within_bounds(freq[c], lo, hi, freq[gcol] if gcol else None).to_numpy()
+    return bounds
+
+def outlier_freq(df, cols, by=None):
+    """Tabel frekuensi (kolom outlier + kolom grup, n); bisa dijumlah lintas chunk/batch."""
+    keys = list(dict.fromkeys([*cols, *(g for g in (_group_col(by, c) for c in cols) if g)]))
+    return df.groupby(keys, dropna=False).size().reset_index(name="n")
+
+def merge_freq(a, b):
+    if a is None:
+        return b
+    keys = [c for c in a.columns if c != "n"]
+    return pd.concat([a, b], ignore_index=True).groupby(keys, dropna=False)["n"].sum().reset_index()
+
+def streaming_bounds(chunks, cols, mode=OUTLIER_MODE, by=None):
+    """Batas IQR exact dari frekuensi gabungan nilai cols (+ kolom grup) lintas chunk.
+
+    Memori sebanding jumlah kombinasi nilai unik, bukan jumlah baris.
+    """
+    freq = None
+    for chunk in chunks:
+        freq = merge_freq(freq, outlier_freq(chunk, cols, by))
+    return [] if freq is None else _freq_bounds(freq, cols, mode, by)
+
+class QuantileSketch:
+    """Sketch quantile KLL: memori ~O(k log n), error rank ~O(1/k), bisa di-update & di-merge."""
+
+    def __init__(self, k=512, seed=0):
+        self.k, self.n = k, 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        v = np.asarray(values, dtype=float)
+        v = v[~np.isnan(v)]
+        self.n += len(v)
+        self.levels[0] = np.concatenate([self.levels[0], v])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        for i, lv in enumerate(other.levels):
+            if i == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[i] = np.concatenate([self.levels[i], lv])
+        self.n += other.n
+        self._compact()
+        return self
+
+    def _compact(self):
+        i = 0
+        while i < len(self.levels):
+            cap = max(int(self.k * (2/3) ** (len(self.levels) - 1 - i)), 2)
+            lv = self.levels[i]
+            if len(lv) > cap:
+                lv = np.sort(lv)
+                odd = len(lv) % 2
+                self.levels[i] = lv[len(lv) - odd:]                   # sisa 1 item bila ganjil
+                promoted = lv[:len(lv) - odd][self.rng.integers(2)::2]  # separuh item, bobot x2
+                if i + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[i + 1] = np.concatenate([self.levels[i + 1], promoted])
+            i += 1
+
+    def weighted_items(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** i) for i, lv in enumerate(self.levels)])
+        return values, weights
+
+    def quantile(self, q):
+        if not self.n:
+            return np.nan
+        return weighted_quantile(*self.weighted_items(), q)
+
+class OutlierSketch:
+    """Statistik IQR approximate per kolom (dan per grup) yang di-update chunk demi chunk."""
+
+    def __init__(self, cols, by=None, k=512):
+        self.cols, self.by, self.k = list(cols), by, k
+        self.sketches = {c: {} for c in self.cols}   # kolom -> {grup (None = global): sketch}
+
+    def update(self, df, col):
+        gcol = _group_col(self.by, col)
+        s = pd.to_numeric(df[col], errors="coerce")
+        parts = s.groupby(df[gcol], dropna=False) if gcol else [(None, s)]
+        for g, vals in parts:
+            self.sketches[col].setdefault(g, QuantileSketch(self.k)).update(vals.to_numpy())
+        return self
+
+    def merge(self, other):
+        for c in self.cols:
+            for g, sk in other.sketches[c].items():
+                if g in self.sketches[c]:
+                    self.sketches[c][g].merge(sk)
+                else:
+                    self.sketches[c][g] = sk
+        return self
+
+    def bounds(self, col):
+        gcol = _group_col(self.by, col)
+        items = {g: sk.weighted_items() for g, sk in self.sketches[col].items() if sk.n}
+        if not items:
+            return (col, gcol, np.nan, np.nan)
+        freq = pd.DataFrame({col: np.concatenate([v for v, _ in items.values()]),
+                             "n": np.concatenate([w for _, w in items.values()])})
+        if gcol:
+            freq[gcol] = np.repeat(list(items), [len(v) for v, _ in items.values()])
+        return _freq_bounds(freq, [col], "independent", self.by)[0]
+
+def sketch_bounds(make_chunks, cols, mode=OUTLIER_MODE, by=None, k=512):
+    """Batas IQR approximate via OutlierSketch; mode sequential butuh satu pass per kolom."""
+    sketch, bounds = OutlierSketch(cols, by=by, k=k), []
+    for c in cols:
+        for chunk in make_chunks():
+            if mode == "sequential":
+                keep = np.ones(len(chunk), dtype=bool)
+                for bc, bg, lo, hi in bounds:
+                    keep &= within_bounds(chunk[bc], lo, hi, chunk[bg] if bg else None).to_numpy()
+                chunk = chunk[keep]
+            sketch.update(chunk, c)
+        bounds.append(sketch.bounds(c))
+    return bounds
+
+def update_reservoir(sample, seen, chunk, k, rng):
+    """Reservoir sampling (Algorithm R) tervektor per chunk; kembalikan (sample, seen)."""
+    m = len(chunk)
+    if m == 0:
+        return sample, seen
+    if sample is None:
+        sample = chunk.iloc[:0]
+    fill = min(max(k - len(sample), 0), m)
+    if fill:
+        sample = pd.concat([sample, chunk.iloc[:fill]], ignore_index=True)
+    rest = chunk.iloc[fill:]
+    if len(rest):
+        idx = np.arange(seen + fill, seen + m)                  # indeks global (0-based)
+        slot = rng.integers(0, idx + 1)
+        hit = np.flatnonzero(slot < k)
+        if len(hit):
+            # baris yang lebih akhir menimpa slot yang sama -> ambil kemunculan terakhir
+            last = pd.Series(hit).groupby(slot[hit]).last()
+            repl = rest.iloc[last.to_numpy()].set_axis(last.index)
+            sample = pd.concat([sample.drop(index=last.index), repl]).sort_index()
+    return sample, seen + m
+
+def stream_locked_aggregates(path, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS,
+                             outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY,
+                             approx=STREAM_APPROX_QUANTILES, memory_mb=STREAM_MEMORY_MB,
+                             sample_size=SAMPLE_SIZE, seed=0):
+    """CLEAN & LOCK per chunk tanpa pernah memuat seluruh file.
+
+    Pass 1 menghitung batas IQR (exact, atau sketch bila approx), pass 2 membuang
+    outlier dan mengakumulasi cube.
+    Kembalikan (cube, sample) dengan sample = reservoir baris locked.
+    """
+    chunk_rows = chunk_rows_for_budget(path, memory_mb)
+    def chunks():
+        for raw in read_chunks(path, chunk_rows):
+            yield clean_rows(raw, date_format=date_format)
+
+    header = pd.read_csv(path, encoding_errors="ignore", nrows=0).columns
+    cols = [c for c in outlier_cols if c in header]
+    if not cols:
+        bounds = []
+    elif approx:
+        bounds = sketch_bounds(chunks, cols, mode=outlier_mode, by=outlier_by)
+    else:
+        bounds = streaming_bounds(chunks(), cols, mode=outlier_mode, by=outlier_by)
+
+    rng = np.random.default_rng(seed)
+    sample, seen = None, 0
+    def parts():
+        nonlocal sample, seen
+        for chunk in chunks():
+            chunk = chunk[bounds_mask(chunk, bounds).to_numpy()]
+            sample, seen = update_reservoir(sample, seen, chunk, sample_size, rng)
+            yield build_cube(chunk)
+    return accumulate_cubes(parts(), chunk_rows), sample
+
+def load_stream_aggregates(path, fingerprint, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS,
+                           outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY, approx=STREAM_APPROX_QUANTILES):
+    """(cube, sample) mode streaming dari snapshot bila masih valid, selain itu stream ulang CSV."""
+    # mode streaming tidak punya df_locked; yang di-snapshot adalah cube & reservoir
+    key = snapshot_key(path, fingerprint, date_format, outlier_cols, outlier_mode, outlier_by, approx=approx)
+    cube_snap, sample_snap = snapshot_path(path, "cube"), snapshot_path(path, "sample")
+    cube, sample = load_snapshot(cube_snap, key), load_snapshot(sample_snap, key)
+    if cube is None or sample is None:
+        cube, sample = stream_locked_aggregates(path, date_format=date_format, outlier_cols=outlier_cols,
+                                                outlier_mode=outlier_mode, outlier_by=outlier_by,
+                                                approx=approx)
+        save_snapshot(cube, cube_snap, key)
+        save_snapshot(sample, sample_snap, key)
+    return cube, sample
+
+# ---------- Append incremental: dataset locked yang dipersist di folder ----------
+RELOCK_TOLERANCE = 0.05   # batas IQR bergeser > 5% lebar IQR lama -> re-lock terarah
+RELOCK_MIN_SCALE = 0.1    # lebar IQR 0 (grup dengan satu nilai dominan): ukur relatif 10% besaran batas
+
+def bounds_mask(df, bounds):
+    keep = pd.Series(True, index=df.index)
+    for c, gcol, lo, hi in bounds:
+        keep &= within_bounds(df[c], lo, hi, df[gcol] if gcol else None)
+    return keep
+
+def _drift(lo0, hi0, lo1, hi1):
+    # pergeseran lo/hi relatif terhadap lebar IQR lama, dengan lantai RELOCK_MIN_SCALE x besaran batas:
+    # grup ber-IQR 0 tidak membuat pergeseran kecil jadi tak terhingga
+    scale = np.maximum(hi0 - lo0, RELOCK_MIN_SCALE * np.maximum(abs(lo0), abs(hi0)))
+    return np.maximum(abs(lo1 - lo0), abs(hi1 - hi0)) / np.maximum(scale, 1e-12)
+
+def bounds_drift(old, new):
+    """Pergeseran terbesar batas lo/hi (lihat _drift); grup baru diabaikan."""
+    drift = 0.0
+    for (c, gcol, lo0, hi0), (_, _, lo1, hi1) in zip(old, new):
+        d = pd.Series(_drift(lo0, hi0, lo1, hi1)).dropna()
+        drift = max(drift, float(d.max()) if len(d) else 0.0)
+    return drift
+
+def relock_bounds(old, fresh, tolerance=RELOCK_TOLERANCE):
+    """Batas yang berlaku setelah append + yang bergeser.
+
+    Batas global / grup yang bergeser > tolerance memakai batas fresh, sisanya tetap batas lama
+    (lock stabil); grup yang baru muncul memakai batas fresh. moved: {kolom: index grup yang
+    bergeser, atau None untuk batas global}.
+    """
+    new, moved = [], {}
+    for (c, gcol, lo0, hi0), (_, _, lo1, hi1) in zip(old, fresh):
+        d = _drift(lo0, hi0, lo1, hi1)
+        if gcol:
+            hit = d.index[(d > tolerance).to_numpy()]
+            lo, hi = lo0.combine_first(lo1), hi0.combine_first(hi1)
+            lo.loc[hit], hi.loc[hit] = lo1.loc[hit], hi1.loc[hit]
+            if len(hit):
+                moved[c] = hit
+        elif d > tolerance:
+            lo, hi = lo1, hi1
+            moved[c] = None
+        else:
+            lo, hi = lo0, hi0
+        new.append((c, gcol, lo, hi))
+    return new, moved
+
+def bounds_to_frame(bounds):
+    parts = []
+    for c, gcol, lo, hi in bounds:
+        if gcol:
+            groups = lo.index.to_series().astype(object)
+            parts.append(pd.DataFrame({"col": c, "group_col": gcol, "group": groups.where(groups.notna(), None).to_numpy(),
+                                       "lo": lo.to_numpy(), "hi": hi.to_numpy()}))
+        else:
+            parts.append(pd.DataFrame({"col": [c], "group_col": [None], "group": [None], "lo": [lo], "hi": [hi]}))
+    return pd.concat(parts, ignore_index=True)
+
+def bounds_from_frame(frame):
+    bounds = []
+    for c, sub in frame.groupby("col", sort=False):
+        gcol = sub["group_col"].iloc[0]
+        if gcol is None or pd.isna(gcol):
+            bounds.append((c, None, float(sub["lo"].iloc[0]), float(sub["hi"].iloc[0])))
+        else:
+            idx = pd.Index(sub["group"].astype(object).where(sub["group"].notna(), np.nan))
+            bounds.append((c, gcol, pd.Series(sub["lo"].to_numpy(), index=idx),
+                           pd.Series(sub["hi"].to_numpy(), index=idx)))
+    return bounds
+
+class LockedStore:
+    """Dataset locked di folder yang bisa ditambah batch transaksi baru tanpa rebuild.
+
+    clean/part-*.parquet : baris hasil clean_rows (sebelum lock outlier), satu file per batch
+    cube.parquet         : cube dari baris locked
+    freq.parquet         : frekuensi nilai kolom outlier (untuk batas IQR exact)
+    bounds.parquet       : batas IQR yang sedang berlaku untuk lock
+    state.json           : parameter cleaning, revisi, fingerprint CSV awal & jumlah baris mentah
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, "state.json")) as f:
+            self.state = json.load(f)
+
+    @staticmethod
+    def exists(root):
+        return os.path.exists(os.path.join(root, "state.json"))
+
+    @classmethod
+    def create(cls, root, raw, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS,
+               outlier_mode=OUTLIER_MODE, outlier_by=OUTLIER_BY, tolerance=RELOCK_TOLERANCE, source_fingerprint=None):
+        store = cls._init(root, raw.shape[1], date_format, outlier_cols, outlier_mode, outlier_by, tolerance,
+                          source_fingerprint)
+        store.append(raw)
+        return store
+
+    @classmethod
+    def from_csv(cls, root, path, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS, outlier_mode=OUTLIER_MODE,
+                 outlier_by=OUTLIER_BY, tolerance=RELOCK_TOLERANCE, source_fingerprint=None,
+                 memory_mb=STREAM_MEMORY_MB):
+        """Store dari CSV per chunk (memori ~memory_mb, berapa pun ukuran file).
+
+        Pass 1: tiap chunk di-clean jadi satu part + frekuensi nilai outlier; batas IQR dari
+        frekuensi gabungan (sama dengan create/clean_and_lock). Pass 2: cube per part locked.
+        """
+        header = pd.read_csv(path, encoding_errors="ignore", nrows=0).columns
+        store = cls._init(root, len(header), date_format, outlier_cols, outlier_mode, outlier_by, tolerance,
+                          source_fingerprint)
+        chunk_rows = chunk_rows_for_budget(path, memory_mb)
+        cols = [c for c in outlier_cols if c in header]
+        freq, part = None, 0
+        for raw in read_chunks(path, chunk_rows):
+            batch = store._clean(raw)
+            if cols:
+                freq = merge_freq(freq, outlier_freq(batch, cols, outlier_by))
+            store._write(batch, f"clean/part-{part:05d}.parquet")
+            store.state["raw_rows"] += len(raw)
+            part += 1
+        bounds = _freq_bounds(freq, cols, outlier_mode, outlier_by) if freq is not None else []
+
+        def parts():
+            for f in store._dataset().files:
+                df = pq.read_table(f).to_pandas()
+                yield build_cube(df[bounds_mask(df, bounds).to_numpy()])
+        cube = accumulate_cubes(parts(), chunk_rows)
+        cube = cube[cube["Count"] != 0].reset_index(drop=True)
+
+        if freq is not None:
+            store._write(freq, "freq.parquet")
+        if bounds:
+            store._write(bounds_to_frame(bounds), "bounds.parquet")
+        store._write(cube, "cube.parquet")
+        store.state["parts"] = part
+        store._commit(f"csv:{source_fingerprint}:{part}:{store.state['raw_rows']}")
+        return store
+
+    @classmethod
+    def _init(cls, root, raw_cols, date_format, outlier_cols, outlier_mode, outlier_by, tolerance,
+              source_fingerprint):
+        os.makedirs(os.path.join(root, "clean"), exist_ok=True)
+        state = {"date_format": date_format, "outlier_cols": list(outlier_cols), "outlier_mode": outlier_mode,
+                 "outlier_by": outlier_by, "tolerance": tolerance, "parts": 0, "revision": "",
+                 "source_fingerprint": source_fingerprint, "raw_rows": 0, "raw_cols": raw_cols}
+        with open(os.path.join(root, "state.json"), "w") as f:
+            json.dump(state, f)
+        return cls(root)
+
+    @property
+    def revision(self):
+        return self.state["revision"]
+
+    @property
+    def source_fingerprint(self):
+        """Fingerprint CSV awal saat store dibuat (None untuk store lama)."""
+        return self.state.get("source_fingerprint")
+
+    def raw_shape(self):
+        """(baris, kolom) mentah: CSV awal + semua batch; None untuk store lama tanpa hitungan."""
+        return (self.state["raw_rows"], self.state["raw_cols"]) if "raw_rows" in self.state else None
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read(self, name):
+        return pq.read_table(self._path(name), memory_map=True).to_pandas() if os.path.exists(self._path(name)) else None
+
+    def _write(self, df, name):
+        tmp = self._path(name) + ".tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+        os.replace(tmp, self._path(name))
+
+    def _clean(self, raw):
+        return clean_rows(raw, date_format=self.state["date_format"]).reset_index(drop=True)
+
+    def _dataset(self):
+        # Quantity int32 per batch, float32 bila batch memuat nilai pecahan -> part dibaca dengan
+        # skema gabungan (int32 + float32 -> double), bukan ArrowInvalid di part yang berbeda
+        files = ds.dataset(self._path("clean"), format="parquet").files
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+        return ds.dataset(files, format="parquet", schema=schema)
+
+    def bounds(self):
+        frame = self._read("bounds.parquet")
+        return [] if frame is None else bounds_from_frame(frame)
+
+    def locked(self):
+        """Seluruh baris locked: part clean yang di-filter dengan batas IQR yang berlaku."""
+        df = sort_categories(self._dataset().to_table().to_pandas())
+        return df[bounds_mask(df, self.bounds())].reset_index(drop=True)
+
+    def cube(self):
+        return self._read("cube.parquet")
+
+    def head(self, n=20):
+        """n baris locked pertama tanpa membaca seluruh store (pratinjau mode streaming)."""
+        bounds, rows = self.bounds(), []
+        for f in self._dataset().files:
+            df = pq.read_table(f).to_pandas()
+            rows.append(df[bounds_mask(df, bounds).to_numpy()].head(n - sum(map(len, rows))))
+            if sum(map(len, rows)) >= n:
+                break
+        return pd.concat(rows, ignore_index=True) if rows else None
+
+    def append(self, raw):
+        """Bersihkan & gabungkan batch baru; kembalikan ringkasan (baris, re-lock, baris berubah)."""
+        cols, mode, by = self.state["outlier_cols"], self.state["outlier_mode"], self.state["outlier_by"]
+        batch = self._clean(raw)
+        cols = [c for c in cols if c in batch.columns]
+        old = self.bounds()
+
+        # statistik outlier: frekuensi nilai ditambah batch (O(nilai unik), bukan O(histori))
+        freq = merge_freq(self._read("freq.parquet"), outlier_freq(batch, cols, by))
+        fresh = _freq_bounds(freq, cols, mode, by) if cols else []
+        # hanya batas (global / per grup) yang benar-benar bergeser yang diganti; sisanya lock lama
+        new, moved_bounds = relock_bounds(old, fresh, self.state["tolerance"]) if old else (fresh, {})
+        relock = bool(moved_bounds)
+
+        cube = self.cube()
+        deltas = [] if cube is None else [cube]
+        changed = scanned = 0
+        if relock:
+            # re-lock terarah: hanya baris histori di grup yang bergeser & di pita antara batas lama & baru
+            moved, scanned = self._relock_rows(old, new, moved_bounds)
+            changed = len(moved)
+            if changed:
+                was_in = bounds_mask(moved, old).to_numpy()
+                gained, lost = moved[~was_in], moved[was_in]
+                deltas.append(build_cube(gained))
+                lost_cube = build_cube(lost)
+                value_cols = [c for c in lost_cube.columns if c not in CUBE_KEYS + ["Year", "Month"]]
+                lost_cube[value_cols] = -lost_cube[value_cols]
+                deltas.append(lost_cube)
+        deltas.append(build_cube(batch[bounds_mask(batch, new)]))
+        cube = merge_cubes(deltas)
+        cube = cube[cube["Count"] != 0].reset_index(drop=True)
+
+        part = self.state["parts"]
+        self._write(batch, f"clean/part-{part:05d}.parquet")
+        self._write(freq, "freq.parquet")
+        if new:
+            self._write(bounds_to_frame(new), "bounds.parquet")
+        self._write(cube, "cube.parquet")
+        self.state["parts"] = part + 1
+        if "raw_rows" in self.state:
+            self.state["raw_rows"] += len(raw)
+        self._commit(f"{part}:{len(batch)}")
+        return {"rows": len(batch), "relocked": relock, "changed_rows": changed, "scanned_rows": scanned,
+                "drift": bounds_drift(old, fresh) if old else 0.0}
+
+    def _commit(self, change):
+        # revisi baru (kunci cache dashboard) lalu state.json diganti atomik
+        self.state["revision"] = hashlib.sha1(f"{self.revision}:{change}".encode()).hexdigest()
+        with open(self._path("state.json") + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(self._path("state.json") + ".tmp", self._path("state.json"))
+
+    def _relock_rows(self, old, new, moved):
+        """(baris histori yang berganti status, baris yang dibaca).
+
+        Hanya kolom/grup di moved yang dipindai: filter grup + pita batas di-push ke Parquet.
+        """
+        if not os.listdir(self._path("clean")):
+            return pd.DataFrame(), 0
+        expr = None
+        for (c, gcol, lo0, hi0), (_, _, lo1, hi1) in zip(old, new):
+            if c not in moved:
+                continue
+            groups = moved[c]
+            if groups is not None:
+                lo0, hi0 = lo0.reindex(groups), hi0.reindex(groups)
+                lo1, hi1 = lo1.reindex(groups), hi1.reindex(groups)
+            lo_min, lo_max = np.nanmin(np.minimum(lo0, lo1)), np.nanmax(np.maximum(lo0, lo1))
+            hi_min, hi_max = np.nanmin(np.minimum(hi0, hi1)), np.nanmax(np.maximum(hi0, hi1))
+            band = (((ds.field(c) >= lo_min) & (ds.field(c) <= lo_max))
+                    | ((ds.field(c) >= hi_min) & (ds.field(c) <= hi_max)))
+            if groups is not None:
+                keys = [g for g in groups if not pd.isna(g)]
+                in_group = ds.field(gcol).isin(pa.array(keys))
+                if len(keys) < len(groups):
+                    in_group = in_group | ds.field(gcol).is_null()
+                band = band & in_group
+            expr = band if expr is None else expr | band
+        rows = self._dataset().to_table(filter=expr).to_pandas()
+        return rows[bounds_mask(rows, old) != bounds_mask(rows, new)], len(rows)
+
+# ---------- Dataset manager: banyak CSV (folder partisi / upload), cache per isi file ----------
+DATASET_MEMORY_MB = 1024          # budget total partisi clean yang disimpan (LRU)
+DATASET_WORKERS = os.cpu_count() or 1
+# proses worker baru (bukan fork): server Streamlit multi-thread, fork bisa mewarisi lock yang sedang dipegang
+DATASET_START_METHOD = "spawn"
+FINGERPRINT_BLOCKS = 16           # blok sampel untuk fingerprint isi (awal, akhir, merata di tengah)
+FINGERPRINT_BLOCK_BYTES = 64 * 1024
+
+def _source_bytes(source):
+    # upload (UploadedFile/BytesIO) atau bytes -> bytes; path dibiarkan (dibaca di worker)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    return source.getvalue() if hasattr(source, "getvalue") else source
+
+def _hash_blocks(size, read, blocks, block_bytes):
+    h = hashlib.sha1(str(size).encode())
+    if size <= blocks * block_bytes:
+        h.update(read(0, size))
+    else:
+        for offset in np.linspace(0, size - block_bytes, blocks).astype(np.int64):
+            h.update(read(int(offset), block_bytes))
+    return h.hexdigest()
+
+def sampled_fingerprint(source, blocks=FINGERPRINT_BLOCKS, block_bytes=FINGERPRINT_BLOCK_BYTES):
+    """Hash murah isi file: ukuran + blok sampel (awal, akhir, merata), bukan seluruh isi; file kecil di-hash utuh.
+
+    source: path, bytes, atau file object in-memory (mis. st.file_uploader) -- dibaca tanpa disalin.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            return _hash_blocks(size, lambda o, n: (f.seek(o), f.read(n))[1], blocks, block_bytes)
+    with (source.getbuffer() if hasattr(source, "getbuffer") else memoryview(source)) as buf:
+        return _hash_blocks(buf.nbytes, lambda o, n: buf[o:o + n], blocks, block_bytes)
+
+def clean_partition(source, date_format=DATE_FORMAT):
+    """Satu CSV -> (baris clean_rows, (baris, kolom) mentah). Top-level agar bisa jalan di proses worker."""
+    raw = load_csv(io.BytesIO(source) if isinstance(source, bytes) else source)
+    shape = raw.shape
+    return clean_rows(raw, date_format=date_format).reset_index(drop=True), shape
+
+def concat_partitions(parts):
+    """Gabung partisi clean_rows: kategori disatukan (str terurut) agar kolom tetap categorical."""
+    if len(parts) == 1:
+        return parts[0]
+    parts = list(parts)
+    for c in parts[0].columns:
+        if isinstance(parts[0][c].dtype, pd.CategoricalDtype):
+            cats = parts[0][c].cat.categories.append([p[c].cat.categories for p in parts[1:]]).unique().sort_values()
+            parts = [p.assign(**{c: p[c].cat.set_categories(cats)}) for p in parts]
+    return pd.concat(parts, ignore_index=True)
+
+class DatasetManager:
+    """Partisi CSV yang sudah di-clean, di-cache per fingerprint isi; dipakai bersama oleh semua sesi.
+
+    Partisi baru di-clean paralel di proses worker (spawn: clean_partition di-import ulang dari
+    eda_core, tanpa mewarisi state thread server); file yang pernah dimuat (nama apa pun) tidak
+    di-parse ulang. Total memori partisi dibatasi max_bytes, yang paling lama tidak dipakai dibuang.
+    Outlier di-lock pada gabungan semua partisi (batas IQR sama dengan satu file berisi semuanya).
+    """
+
+    def __init__(self, max_bytes=DATASET_MEMORY_MB * 1024**2, workers=DATASET_WORKERS,
+                 start_method=DATASET_START_METHOD):
+        self.max_bytes, self.workers, self.start_method = max_bytes, workers, start_method
+        self.items, self.nbytes = OrderedDict(), 0   # (fingerprint, date_format) -> (partisi, shape mentah, byte)
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def directory_sources(root):
+        """File *.csv di folder (urut nama) sebagai partisi satu dataset."""
+        names = sorted(n for n in os.listdir(root) if n.lower().endswith(".csv"))
+        if not names:
+            raise ValueError(f"Tidak ada file CSV di folder {root}")
+        return [os.path.join(root, n) for n in names]
+
+    def fingerprint(self, sources):
+        """(fingerprint gabungan, fingerprint per partisi); urutan partisi ikut menentukan."""
+        fps = [sampled_fingerprint(s) for s in sources]
+        return hashlib.sha1(":".join(fps).encode()).hexdigest(), fps
+
+    def partitions(self, sources, fingerprints=None, date_format=DATE_FORMAT):
+        """Partisi clean per source (dari cache, atau di-clean; yang baru paralel di worker)."""
+        # parameter clean_rows ikut kunci: format tanggal lain -> partisi di-clean ulang
+        fps = [(fp, date_format) for fp in (fingerprints or self.fingerprint(sources)[1])]
+        found = {}
+        with self._lock:
+            for fp in fps:
+                if fp in self.items:
+                    self.items.move_to_end(fp)
+                    found[fp] = self.items[fp]
+        todo = {fp: _source_bytes(s) for fp, s in zip(fps, sources) if fp not in found}
+        with self._lock:
+            self.hits += len(fps) - len(todo)
+            self.misses += len(todo)
+        # clean di luar lock: sesi lain tetap bisa memakai partisi yang sudah ada
+        if len(todo) > 1 and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(todo)),
+                                     mp_context=multiprocessing.get_context(self.start_method)) as pool:
+                futures = {fp: pool.submit(clean_partition, src, date_format) for fp, src in todo.items()}
+                cleaned = {fp: f.result() for fp, f in futures.items()}
+        else:
+            cleaned = {fp: clean_partition(src, date_format) for fp, src in todo.items()}
+        with self._lock:
+            for fp, (part, shape) in cleaned.items():
+                if fp not in self.items:
+                    nbytes = int(part.memory_usage(index=True, deep=True).sum())
+                    self.items[fp] = (part, shape, nbytes)
+                    self.nbytes += nbytes
+                found[fp] = self.items[fp]
+            while len(self.items) > 1 and self.nbytes > self.max_bytes:
+                _, (_, _, old) = self.items.popitem(last=False)
+                self.nbytes -= old
+        return [found[fp][:2] for fp in fps]
+
+    def load(self, sources, date_format=DATE_FORMAT, outlier_cols=OUTLIER_COLS, outlier_mode=OUTLIER_MODE,
+             outlier_by=OUTLIER_BY):
+        """(fingerprint gabungan, df_locked, (baris, kolom) mentah) untuk daftar CSV/upload."""
+        fingerprint, fps = self.fingerprint(sources)
+        loaded = self.partitions(sources, fps, date_format)
+        df = concat_partitions([part for part, _ in loaded])
+        shape = (sum(rows for _, (rows, _) in loaded), loaded[0][1][1])
+        locked = lock_rows(df, outlier_cols=outlier_cols, outlier_mode=outlier_mode, outlier_by=outlier_by)
+        return fingerprint, locked, shape
+
+# ---------- Top-K produk: exact (partial selection) atau Space-Saving, per bulan & mergeable ----------
+TOPK_CAPACITY = None   # None: total exact per produk; angka: counter Space-Saving per bulan (memori tetap)
+
+def group_sum(df, key, measure):
+    """Jumlah measure per kunci via bincount atas kode categorical (tanpa groupby/sort semua grup)."""
+    keys = df[key] if isinstance(df[key].dtype, pd.CategoricalDtype) else df[key].astype("category")
+    codes = keys.cat.codes.to_numpy()
+    valid = codes >= 0
+    n = len(keys.cat.categories)
+    values = df[measure].to_numpy()[valid]
+    sums = np.bincount(codes[valid], weights=values, minlength=n)
+    if np.issubdtype(values.dtype, np.integer):
+        sums = sums.astype("int64")
+    seen = np.bincount(codes[valid], minlength=n) > 0   # sama dengan groupby(observed=True)
+    return pd.Series(sums[seen], index=keys.cat.categories[seen], name=measure).rename_axis(key)
+
+def sum_series(parts):
+    """Jumlahkan beberapa Series kunci -> total per kunci (hash via factorize + bincount, tanpa sort)."""
+    if len(parts) == 1:
+        return parts[0]
+    both = pd.concat(parts)
+    codes, keys = pd.factorize(both.index)
+    sums = np.bincount(codes, weights=both.to_numpy(), minlength=len(keys))
+    return pd.Series(sums.astype(both.dtype), index=keys, name=both.name).rename_axis(both.index.name)
+
+def top_k(s, n):
+    """n nilai terbesar: np.partition memilih kandidat, hanya kandidat yang di-sort (nilai sama -> urut label)."""
+    v = s.to_numpy()
+    if len(v) > n > 0:
+        kth = np.partition(v, len(v) - n)[len(v) - n]
+        s = s[v >= kth]
+    return s.sort_index(kind="stable").sort_values(ascending=False, kind="stable").head(n)
+
+class SpaceSaving:
+    """Heavy hitter Space-Saving berbobot dengan maksimal `capacity` counter; bisa di-update & di-merge.
+
+    Tiap counter menyimpan count (>= total asli) dan error (count - error <= total asli).
+    Kunci di luar counter totalnya <= floor(); kunci dengan total > total/capacity pasti tercatat.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity, self.total = capacity, 0
+        self.counters = pd.DataFrame({"count": pd.Series(dtype=float), "error": pd.Series(dtype=float)})
+
+    def floor(self):
+        return float(self.counters["count"].min()) if len(self.counters) >= self.capacity else 0.0
+
+    def update(self, counts):
+        """counts: Series kunci -> bobot yang sudah diagregasi per chunk (mis. hasil group_sum)."""
+        exact = SpaceSaving(len(counts) + 1)   # ringkasan exact: floor 0, error 0
+        exact.counters = pd.DataFrame({"count": counts.astype(float), "error": 0.0})
+        exact.total = counts.sum()
+        return self.merge(exact)
+
+    def merge(self, other):
+        # kunci yang tidak ada di satu ringkasan diberi floor ringkasan itu (batas atas total aslinya)
+        fa, fb = self.floor(), other.floor()
+        both = self.counters.join(other.counters, how="outer", lsuffix="_a", rsuffix="_b")
+        merged = pd.DataFrame({"count": both["count_a"].fillna(fa) + both["count_b"].fillna(fb),
+                               "error": both["error_a"].fillna(fa) + both["error_b"].fillna(fb)})
+        self.counters = merged.loc[top_k(merged["count"], self.capacity).index]
+        self.total += other.total
+        return self
+
+    def top(self, n):
+        return self.counters.loc[top_k(self.counters["count"], n).index]
+
+class ProductTopK:
+    """Total Quantity per produk per (Year, Month) yang bisa di-update per chunk dan di-merge antar partisi.
+
+    capacity=None menyimpan total exact per bulan; angka -> SpaceSaving per bulan (hasil approximate,
+    kolom Error = batas atas kelebihan estimasi). top() melayani seluruh data maupun bulan mana pun.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY):
+        self.capacity, self.parts = capacity, {}
+
+    @classmethod
+    def from_frame(cls, df, capacity=TOPK_CAPACITY):
+        return cls(capacity).update(df)
+
+    def update(self, df):
+        """df: baris locked atau sel cube (butuh Year, Month, Description, Quantity)."""
+        for (year, month), part in df.groupby(["Year", "Month"], sort=True, observed=True):
+            self._add((int(year), int(month)), group_sum(part, "Description", "Quantity"))
+        return self
+
+    def merge(self, other):
+        for key, part in other.parts.items():
+            self._add(key, part)
+        return self
+
+    def _add(self, key, counts):
+        # counts: total exact (Series) atau SpaceSaving dari ProductTopK lain
+        if self.capacity is None:
+            old = self.parts.get(key)
+            self.parts[key] = counts if old is None else sum_series([old, counts])
+        elif isinstance(counts, SpaceSaving):
+            self.parts.setdefault(key, SpaceSaving(self.capacity)).merge(counts)
+        else:
+            self.parts.setdefault(key, SpaceSaving(self.capacity)).update(counts)
+
+    def months(self):
+        return sorted(self.parts)
+
+    def top(self, n=10, year=None, month=None):
+        """Top-n produk seluruh data atau satu tahun/bulan; kolom sama dengan top_products."""
+        keys = [k for k in self.parts if (year is None or k[0] == year) and (month is None or k[1] == month)]
+        if self.capacity is None:
+            parts = [self.parts[k] for k in keys]
+            if not parts:
+                return pd.DataFrame({"Description": pd.Series(dtype=str), "Quantity": pd.Series(dtype="int64")})
+            return top_k(sum_series(parts), n).rename_axis("Description").reset_index(name="Quantity")
+        sk = SpaceSaving(self.capacity)
+        for k in keys:
+            sk.merge(self.parts[k])
+        top = sk.top(n).rename_axis("Description").reset_index()
+        return pd.DataFrame({"Description": top["Description"].astype(str),
+                             "Quantity": top["count"].astype("int64"), "Error": top["error"].astype("int64")})
+
+# ---------- Insight: tabel di balik tiap bagian Business Insight ----------
+def overview(cube):
+    return {"rows": int(cube["Count"].sum()),
+            "products": int(cube["Description"].nunique()) if "Description" in cube else None,
+            "countries": int(cube["Country"].nunique()) if "Country" in cube else None,
+            "revenue": float(cube["Revenue"].sum())}
+
+# sort stabil: nilai sama -> urut kunci (hasil groupby), sama dengan ORDER BY nilai DESC, kunci
+def _plain_labels(table, col):
+    # kunci categorical -> nilai biasa: grafik mengikuti urutan baris, bukan semua kategori
+    if isinstance(table[col].dtype, pd.CategoricalDtype):
+        table[col] = table[col].astype(table[col].cat.categories.dtype)
+    return table
+
+def top_countries(cube, n=5):
+    if "Country" not in cube.columns:
+        return None
+    return _plain_labels(cube.groupby("Country", as_index=False, observed=True)["Revenue"].sum()
+                             .sort_values("Revenue", ascending=False, kind="stable").head(n), "Country")
+
+def top_products(cube, n=10):
+    if not {"Description", "Quantity"}.issubset(cube.columns):
+        return None
+    return top_k(group_sum(cube, "Description", "Quantity"), n).reset_index()
+
+def transactions_per_hour(cube):
+    if "Hour" not in cube.columns:
+        return None
+    return cube.groupby("Hour")["Count"].sum().reindex(range(24), fill_value=0)
+
+def monthly_revenue(cube, year=2011):
+    if not {"Year", "Month"}.issubset(cube.columns):
+        return None
+    revenue = (cube[cube["Year"] == year].groupby("Month", as_index=False)["Revenue"].sum()
+                                         .sort_values("Month"))
+    revenue.insert(1, "Month_Name", revenue["Month"].map(MONTH_MAP))
+    return revenue
+
+def top_products_in_month(cube, month=11, n=10):
+    if "Month" not in cube.columns:
+        return None
+    return top_products(cube[cube["Month"] == month], n=n)
+
+def correlation(cube):
+    num_cols = [c for c in CUBE_MEASURES if c in cube.columns]
+    return cube_corr(cube, num_cols) if len(num_cols) >= 2 else None
+
+VIEW_INSIGHTS = {   # bergantung pada filter (cube_view)
+    "top5_view": top_countries,
+    "top_product_view": top_products,
+    "trx_hour": transactions_per_hour,
+    "year_revenue": monthly_revenue,
+    "corr": correlation,
+}
+GLOBAL_INSIGHTS = {   # selalu dari seluruh cube, tidak berubah oleh filter
+    "overview": overview,
+    "top_all": top_products,
+    "prod_nov": top_products_in_month,
+}
+
+def _run_insights(funcs, cube, executor=None):
+    # agregasi saling independen -> bisa dijalankan bersamaan di thread pool
+    if executor is None:
+        return {name: fn(cube) for name, fn in funcs.items()}
+    futures = {name: executor.submit(fn, cube) for name, fn in funcs.items()}
+    return {name: f.result() for name, f in futures.items()}
+
+def view_insights(cube_view, executor=None):
+    return _run_insights(VIEW_INSIGHTS, cube_view, executor)
+
+def global_insights(cube, executor=None):
+    return _run_insights(GLOBAL_INSIGHTS, cube, executor)
+
+# ---------- Preview: sampel berstrata (Country x bulan) dengan CI ----------
+PREVIEW_FRACTION = 0.05          # porsi sel cube yang diambil per strata
+PREVIEW_MIN_PER_STRATUM = 20     # strata kecil: minimal sekian sel (atau semuanya)
+PREVIEW_MIN_CELLS = 500_000      # cube di atas ini: dashboard default ke mode preview
+PREVIEW_Z = 1.96                 # CI 95%
+
+class StratifiedSample:
+    """Sampel acak sel cube per strata Country x bulan + estimasi total per grup dengan CI.
+
+    Dibangun sekali per dataset locked; filter Country/tanggal hanya memilih baris sampel.
+    Total = sum(N_h / n_h * y) per strata h; varians stratified dengan koreksi populasi
+    hingga, y di luar filter dihitung 0 (estimasi domain). Kolom "CI" = setengah lebar CI.
+    """
+
+    def __init__(self, cube, fraction=PREVIEW_FRACTION, min_per_stratum=PREVIEW_MIN_PER_STRATUM, seed=0):
+        stratum, _ = _group_codes(cube, [c for c in ("Country", "Year", "Month") if c in cube.columns])
+        N = np.bincount(stratum)
+        n = np.minimum(N, np.maximum(min_per_stratum, np.ceil(fraction * N).astype(np.int64)))
+        # urut per strata, acak di dalamnya -> ambil n_h teratas tiap strata
+        order = np.lexsort((np.random.default_rng(seed).random(len(cube)), stratum))
+        rank = np.empty(len(cube), dtype=np.int64)
+        rank[order] = np.arange(len(cube)) - np.repeat(np.cumsum(N) - N, N)
+        keep = rank < n[stratum]
+        self.N, self.n = N, n
+        self.fraction = float(n.sum() / max(N.sum(), 1))
+        self.index = FilterIndex(cube[keep].assign(Stratum=stratum[keep]), date_col="Date")
+
+    def rows(self, countries=None, d_from=None, d_to=None):
+        """Baris sampel strata negara terpilih (semua bulan) + mask baris di dalam filter tanggal."""
+        rows = self.index.select(countries)
+        inside = np.ones(len(rows), dtype=bool)
+        if d_from is not None and d_to is not None and "Date" in rows.columns:
+            dates = rows["Date"].to_numpy("datetime64[ns]")
+            inside = ((dates >= np.datetime64(pd.Timestamp(d_from)))
+                      & (dates < np.datetime64(pd.Timestamp(d_to) + pd.Timedelta(days=1))))
+        return rows, inside
+
+    def estimate(self, rows, inside, by, measure):
+        """Estimasi total measure per nilai by + kolom CI; y di luar mask inside dihitung 0."""
+        rows = rows[inside]
+        if isinstance(rows[by].dtype, pd.CategoricalDtype):   # kode categorical: tanpa hashing ulang
+            g, groups = rows[by].cat.codes.to_numpy(np.int64), rows[by].cat.categories
+        else:
+            g, groups = pd.factorize(rows[by], sort=True)
+        # kunci NaN (kode -1) tidak masuk grup mana pun: dibuang, bukan terlipat ke sel (strata, grup) tetangga;
+        # untuk tiap grup baris itu tetap bernilai 0 lewat n_h (ukuran sampel strata)
+        known = g >= 0
+        g, rows = g[known], rows[known]
+        y = rows[measure].to_numpy(float)
+        h = rows["Stratum"].to_numpy(np.int64)
+        # jumlah y & y^2 per (strata, grup); sel sampel lain di strata = 0 untuk grup ini
+        k = max(len(groups), 1)
+        inv, cell = pd.factorize(h * k + g)
+        s1, s2 = np.bincount(inv, weights=y), np.bincount(inv, weights=y * y)
+        hh, gg = cell // k, cell % k
+        N, n = self.N[hh].astype(float), self.n[hh].astype(float)
+        s_var = np.where(n > 1, (s2 - s1 * s1 / n) / np.maximum(n - 1, 1), 0.0)
+        var = N * N * (1 - n / N) * np.maximum(s_var, 0) / n
+        total = np.bincount(gg, weights=N / n * s1, minlength=len(groups))
+        ci = PREVIEW_Z * np.sqrt(np.bincount(gg, weights=var, minlength=len(groups)))
+        out = pd.DataFrame({by: np.asarray(groups), measure: total, "CI": ci})
+        return out[np.bincount(gg, minlength=len(groups)) > 0].reset_index(drop=True)
+
+    def view_insights(self, countries=None, d_from=None, d_to=None):
+        """Tabel preview untuk grafik Business Insight 1-4 (skema sama dengan exact + kolom CI)."""
+        rows, inside = self.rows(countries, d_from, d_to)
+        cols = rows.columns
+        out = dict.fromkeys(["top5_view", "top_product_view", "trx_hour", "year_revenue"])
+        if "Country" in cols:
+            out["top5_view"] = self.estimate(rows, inside, "Country", "Revenue").sort_values(
+                "Revenue", ascending=False, kind="stable").head(5)
+        if {"Description", "Quantity"}.issubset(cols):
+            products = self.estimate(rows, inside, "Description", "Quantity").set_index("Description")
+            top = top_k(products["Quantity"], 10)
+            out["top_product_view"] = top.reset_index().assign(CI=products.loc[top.index, "CI"].to_numpy())
+        if "Hour" in cols:
+            out["trx_hour"] = (self.estimate(rows, inside, "Hour", "Count").set_index("Hour")
+                               .reindex(range(24), fill_value=0.0))
+        if {"Year", "Month"}.issubset(cols):
+            revenue = self.estimate(rows, inside & (rows["Year"] == 2011).to_numpy(), "Month", "Revenue")
+            revenue.insert(1, "Month_Name", revenue["Month"].map(MONTH_MAP))
+            out["year_revenue"] = revenue
+        return out
+
+# ---------- RFM pelanggan (Recency, Frequency, Monetary) ----------
+RFM_BINS = 5   # skor 1..5 per dimensi (kuantil jumlah pelanggan sama)
+RFM_PARALLEL_MIN_CELLS = 500_000   # di bawah ini satu pass tervektor lebih cepat dari partisi paralel
+# segmen dari skor (R, F): baris = R 1..5, kolom = F 1..5 (peta segmentasi RFM klasik)
+RFM_SEGMENT_GRID = np.array([
+    ["Hibernating", "Hibernating", "At Risk", "At Risk", "Can't Lose"],
+    ["Hibernating", "Hibernating", "At Risk", "At Risk", "Can't Lose"],
+    ["About to Sleep", "About to Sleep", "Need Attention", "Loyal Customers", "Loyal Customers"],
+    ["Promising", "Potential Loyalists", "Potential Loyalists", "Loyal Customers", "Loyal Customers"],
+    ["New Customers", "Potential Loyalists", "Potential Loyalists", "Champions", "Champions"],
+])
+RFM_SEGMENTS = ["Champions", "Loyal Customers", "Potential Loyalists", "New Customers", "Promising",
+                "Need Attention", "About to Sleep", "At Risk", "Can't Lose", "Hibernating"]
+
+CUSTOMER_AGG = {"Invoices": "sum", "Revenue": "sum", "LastInvoice": "max"}
+
+def customer_ids(s):
+    """CustomerID sebagai kunci: int64 bila semua ID bilangan bulat (mis. 14584.0 dari CSV),
+    selain itu (mis. "C123") categorical str; tidak pernah gagal karena format ID."""
+    num = pd.to_numeric(s, errors="coerce")
+    if num.notna().all() and (num % 1 == 0).all():
+        return num.astype("int64")
+    return as_category(s)
+
+def build_customer_cube(df):
+    """Pre-agregasi baris locked per (CustomerID, Date, Country) untuk RFM.
+
+    Satu invoice hanya punya satu pelanggan, tanggal & negara, jadi Invoices (invoice unik)
+    bisa dijumlahkan lintas sel; sel difilter dengan FilterIndex(date_col="Date") seperti cube.
+    """
+    need = {"CustomerID", "InvoiceNo", "InvoiceDate", "Revenue"}
+    if not need.issubset(df.columns):
+        return None
+    rows = df[df["CustomerID"].notna() & df["InvoiceDate"].notna()]
+    cells = pd.DataFrame({"CustomerID": customer_ids(rows["CustomerID"]),
+                          "Date": rows["InvoiceDate"].dt.normalize()})
+    if "Country" in rows.columns:
+        cells["Country"] = rows["Country"]
+    keys = list(cells.columns)
+    cells["Invoices"] = (~rows["InvoiceNo"].duplicated()).astype("int64")   # baris pertama tiap invoice
+    cells["Revenue"] = rows["Revenue"].astype("float64")
+    cells["LastInvoice"] = rows["InvoiceDate"]
+    return cells.groupby(keys, sort=False, observed=True).agg(CUSTOMER_AGG).reset_index()
+
+def merge_customer_cubes(parts):
+    """Gabungkan customer cube parsial (mis. per chunk/partisi); invoice tidak boleh terbelah antar part."""
+    cells = pd.concat(parts, ignore_index=True)
+    keys = [k for k in ("CustomerID", "Date", "Country") if k in cells.columns]
+    return cells.groupby(keys, sort=False, observed=True).agg(CUSTOMER_AGG).reset_index()
+
+def _customer_totals(cells):
+    g = cells.groupby("CustomerID", sort=True, observed=True)
+    return pd.DataFrame({"LastInvoice": g["LastInvoice"].max(), "Frequency": g["Invoices"].sum(),
+                         "Monetary": g["Revenue"].sum()})
+
+def rfm_score(values, higher_is_better=True, bins=RFM_BINS):
+    """Skor kuantil 1..bins dari rank persentil; nilai sama -> rank rata-rata -> skor sama.
+
+    Nilai yang sangat sering (mis. Frequency = 1) jatuh di satu skor, jadi jumlah pelanggan
+    per skor tidak selalu sama; urutan CustomerID tidak pernah menentukan skor.
+    """
+    score = np.ceil(values.rank(method="average", pct=True).to_numpy() * bins).astype("int8")
+    return score if higher_is_better else (bins + 1 - score).astype("int8")
+
+def customer_rfm(cells, as_of=None, executor=None, partitions=4, min_cells=RFM_PARALLEL_MIN_CELLS):
+    """Tabel RFM per pelanggan dari sel customer cube (boleh hasil filter).
+
+    Recency = hari sejak transaksi terakhir s.d. as_of (default: sehari setelah transaksi
+    terakhir di sel), Frequency = invoice unik, Monetary = total Revenue. Dengan executor,
+    agregasi per pelanggan dibagi ke partisi CustomerID (modulo ID/kode kategori, bila sel >= min_cells) lalu
+    digabung; skor kuantil selalu dihitung atas semua pelanggan.
+    """
+    if cells is None or cells.empty:
+        return None
+    if executor is None or partitions <= 1 or len(cells) < min_cells:
+        totals = _customer_totals(cells)
+    else:
+        ids = cells["CustomerID"]
+        part = (ids.cat.codes if isinstance(ids.dtype, pd.CategoricalDtype) else ids).to_numpy() % partitions
+        futures = [executor.submit(_customer_totals, cells[part == i]) for i in range(partitions)]
+        totals = pd.concat([f.result() for f in futures]).sort_index()
+    as_of = pd.Timestamp(as_of) if as_of is not None else totals["LastInvoice"].max().normalize() + pd.Timedelta(days=1)
+    rfm = pd.DataFrame({"Recency": (as_of - totals["LastInvoice"].dt.normalize()).dt.days.astype("int32"),
+                        "Frequency": totals["Frequency"], "Monetary": totals["Monetary"]})
+    rfm["R"] = rfm_score(rfm["Recency"], higher_is_better=False)
+    rfm["F"] = rfm_score(rfm["Frequency"])
+    rfm["M"] = rfm_score(rfm["Monetary"])
+    rfm["RFM"] = rfm["R"].astype("int16") * 100 + rfm["F"] * 10 + rfm["M"]   # mis. 545
+    rfm["Segment"] = pd.Categorical(RFM_SEGMENT_GRID[rfm["R"] - 1, rfm["F"] - 1], categories=RFM_SEGMENTS)
+    return rfm.reset_index()
+
+def rfm_segments(rfm):
+    """Ringkasan per segmen: jumlah & porsi pelanggan, rata-rata R/F/M, total revenue."""
+    if rfm is None:
+        return None
+    g = rfm.groupby("Segment", observed=False)
+    table = pd.DataFrame({"Customers": g.size(), "Recency": g["Recency"].mean(),
+                          "Frequency": g["Frequency"].mean(), "Monetary": g["Monetary"].mean(),
+                          "Revenue": g["Monetary"].sum()})
+    table.insert(1, "Share", table["Customers"] / max(len(rfm), 1))
+    table = table.reset_index()
+    table["Segment"] = table["Segment"].astype(str)
+    return table
+
+# ---------- Market basket: co-occurrence produk per invoice (matriks sparse) ----------
+BASKET_MIN_SUPPORT = 0.001   # pasangan minimal ada di 0.1% invoice ...
+BASKET_MIN_INVOICES = 2      # ... dan minimal di 2 invoice
+
+def build_basket_lines(df, item="Description"):
+    """Baris unik (InvoiceNo, item) + Date & Country invoice, untuk basket ber-filter via FilterIndex."""
+    if not {"InvoiceNo", item}.issubset(df.columns):
+        return None
+    cols = ["InvoiceNo", item] + [c for c in ("InvoiceDate", "Country") if c in df.columns]
+    lines = df[cols].drop_duplicates(["InvoiceNo", item])
+    if "InvoiceDate" in lines.columns:
+        lines = lines.rename(columns={"InvoiceDate": "Date"})
+        lines["Date"] = lines["Date"].dt.normalize()
+    return lines.reset_index(drop=True)
+
+def basket_pairs(lines, item="Description", min_support=BASKET_MIN_SUPPORT, min_invoices=BASKET_MIN_INVOICES):
+    """Pasangan produk yang sering dibeli bersama: support, confidence dua arah & lift.
+
+    Matriks insiden invoice x produk (CSR biner) -> co-occurrence = X^T X (sparse, di C).
+    Produk di bawah ambang support dibuang lebih dulu (pasangan tidak mungkin lolos) dan
+    invoice dengan < 2 produk tersisa dilewati, jadi tidak ada matriks dense atau loop pasangan.
+    """
+    try:
+        from scipy import sparse
+    except ImportError as e:
+        raise ImportError("Market basket butuh paket scipy (pip install scipy).") from e
+    if lines is None or lines.empty:
+        return None
+    inv, _ = pd.factorize(lines["InvoiceNo"])
+    prod, labels = pd.factorize(lines[item])
+    labels = pd.Index(labels).astype(str)
+    ok = (inv >= 0) & (prod >= 0)
+    n_invoices = int(inv.max()) + 1
+    X = sparse.csr_matrix((np.ones(int(ok.sum()), dtype=np.int32), (inv[ok], prod[ok])),
+                          shape=(n_invoices, len(labels)))
+    X.data[:] = 1   # duplikat (InvoiceNo, item) dijumlahkan csr_matrix -> tetap biner
+
+    threshold = max(int(np.ceil(min_support * n_invoices)), min_invoices)
+    counts = np.asarray(X.sum(axis=0)).ravel()
+    keep = np.flatnonzero(counts >= threshold)
+    X = X[:, keep]
+    X = X[np.diff(X.indptr) >= 2]
+    co = sparse.triu(X.T @ X, k=1).tocoo()   # tiap pasangan sekali (a < b)
+    hit = co.data >= threshold
+    a, b, n_ab = keep[co.row[hit]], keep[co.col[hit]], co.data[hit].astype("int64")
+
+    pairs = pd.DataFrame({"A": labels[a], "B": labels[b], "Invoices": n_ab,
+                          "Support": n_ab / n_invoices,
+                          "Confidence A→B": n_ab / counts[a], "Confidence B→A": n_ab / counts[b],
+                          "Lift": n_ab * n_invoices / (counts[a].astype(float) * counts[b])})
+    pairs.attrs.update(invoices=n_invoices, threshold=threshold)
+    return pairs.sort_values(["Invoices", "Lift", "A", "B"], ascending=[False, False, True, True],
+                             kind="stable").reset_index(drop=True)
+
+def top_bundles(pairs, n=10):
+    """Bundle teratas: pasangan dengan invoice terbanyak, lift > 1 (lebih sering dari kebetulan)."""
+    if pairs is None:
+        return None
+    return pairs[pairs["Lift"] > 1].head(n).reset_index(drop=True)
+
+# ---------- Statistik partisi mergeable: momen (Welford/Chan) & distinct count (HyperLogLog) ----------
+STATS_KEYS = ["Date", "Country"]   # satu state per hari x negara
+HLL_PRECISION = 12                 # 2^12 register per partisi, error relatif ~1.04/sqrt(4096) = 1.6%
+
+def _pairs(measures):
+    return [(a, b) for i, a in enumerate(measures) for b in measures[i:]]
+
+def merge_moments(states, measures, keys=None):
+    """Gabungkan state (n, mean per measure, co-moment C per pasangan) per kunci, rumus Chan.
+
+    C_ab = sum C_i + sum n_i (mean_ia - mean_a)(mean_ib - mean_b): stabil numerik (tanpa
+    jumlah kuadrat mentah). Kolom C yang tidak ada dianggap 0 (mis. state satu baris).
+    keys=None menggabungkan semua state jadi satu baris.
+    """
+    codes, out = _group_codes(states, keys)
+    return _merge_grouped(states, measures, codes, out)
+
+def _group_codes(frame, keys):
+    # kode grup per baris + frame kunci unik (urutan = kode)
+    if not keys:
+        return np.zeros(len(frame), dtype=np.intp), pd.DataFrame(index=range(1))
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(frame[keys]))
+    return codes, uniques.to_frame(index=False, name=keys)
+
+def _merge_grouped(states, measures, codes, out):
+    # kolom dikumpulkan dulu lalu dipasang sekali: merge beberapa ratus partisi ~ overhead numpy saja
+    n_groups = len(out)
+    n_i = states["n"].to_numpy(float)
+    n = np.bincount(codes, weights=n_i, minlength=n_groups)
+    cols, dev = {"n": n}, {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for a in measures:
+            m_i = states[f"mean:{a}"].to_numpy(float)
+            mean = np.bincount(codes, weights=n_i * m_i, minlength=n_groups) / n
+            dev[a] = m_i - mean[codes]
+            cols[f"mean:{a}"] = mean
+    for a, b in _pairs(measures):
+        col = f"C:{a}*{b}"
+        within = states[col].to_numpy(float) if col in states.columns else 0.0
+        cols[col] = np.bincount(codes, weights=within + n_i * dev[a] * dev[b], minlength=n_groups)
+    return pd.concat([out, pd.DataFrame(cols, index=out.index)], axis=1)
+
+def moment_states(df, measures):
+    """State momen per baris locked (n=1, C=0) atau per sel cube (dari jumlah & cross-product sel)."""
+    if "Count" not in df.columns:
+        return pd.DataFrame({"n": 1.0, **{f"mean:{a}": df[a].astype(float) for a in measures}}, index=df.index)
+    n = df["Count"].to_numpy(float)
+    states = pd.DataFrame({"n": n, **{f"mean:{a}": df[a].to_numpy(float) / n for a in measures}}, index=df.index)
+    for a, b in _pairs(measures):
+        key = f"{a}*{b}" if f"{a}*{b}" in df.columns else f"{b}*{a}"
+        states[f"C:{a}*{b}"] = df[key].to_numpy(float) - df[a].to_numpy(float) * df[b].to_numpy(float) / n
+    return states
+
+def moments_corr(state, measures):
+    """Matriks korelasi Pearson dari satu state hasil merge_moments."""
+    k = len(measures)
+    corr = np.empty((k, k))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i, a in enumerate(measures):
+            for j, b in enumerate(measures[i:], start=i):
+                corr[i, j] = corr[j, i] = (state[f"C:{a}*{b}"]
+                                           / np.sqrt(state[f"C:{a}*{a}"] * state[f"C:{b}*{b}"]))
+    return pd.DataFrame(corr, index=measures, columns=measures)
+
+def _bit_length(x):
+    # panjang bit uint64 tervektor (binary search 6 langkah, tanpa konversi float)
+    x, n = x.copy(), np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+def hll_registers(groups, n_groups, hashes, precision=HLL_PRECISION):
+    """Register HyperLogLog per grup: indeks = p bit teratas hash, nilai = posisi bit 1 pertama sisanya."""
+    m, rest = 1 << precision, 64 - precision
+    regs = np.zeros((n_groups, m), dtype=np.uint8)
+    idx = (hashes >> np.uint64(rest)).astype(np.intp)
+    tail = hashes & np.uint64((1 << rest) - 1)
+    rank = (rest - _bit_length(tail) + 1).astype(np.uint8)
+    np.maximum.at(regs, (groups, idx), rank)
+    return regs
+
+def hll_estimate(regs):
+    """Estimasi distinct count dari register (hasil max beberapa partisi), dengan linear counting di range kecil."""
+    m = regs.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.power(2.0, -regs.astype(float)), axis=-1)
+    zeros = np.sum(regs == 0, axis=-1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+class PartitionStats:
+    """State statistik per partisi (Date x Country) yang bisa dipilih dengan filter dan di-merge.
+
+    Tiap partisi menyimpan momen Quantity/UnitPrice/Revenue (n, mean, co-moment) dan register
+    HyperLogLog produk. Korelasi & ringkasan untuk filter apa pun = merge state partisi terpilih,
+    waktunya sebanding jumlah partisi, bukan baris. Jumlah negara exact (negara = kunci partisi).
+    Baris dengan Date/Country kosong tetap jadi partisi sendiri: ikut di state tanpa filter
+    (sama dengan cube), dan baru terbuang saat filter tanggal/negara dipasang (FilterIndex).
+    """
+
+    def __init__(self, df, precision=HLL_PRECISION):
+        self.measures = [m for m in CUBE_MEASURES if m in df.columns]
+        keys = pd.DataFrame(index=df.index)
+        if "Date" in df.columns or "InvoiceDate" in df.columns:
+            keys["Date"] = df["Date"] if "Date" in df.columns else df["InvoiceDate"].dt.normalize()
+        if "Country" in df.columns:
+            keys["Country"] = df["Country"]
+        states = pd.concat([keys, moment_states(df, self.measures)], axis=1)
+        groups, table = _group_codes(states, list(keys.columns))
+        table = _merge_grouped(states, self.measures, groups, table)
+        table["part"] = np.arange(len(table))   # baris register HLL; FilterIndex mengurutkan ulang tabel
+        self.index = FilterIndex(table, date_col="Date")
+
+        self.registers = None
+        if "Description" in df.columns:
+            desc = df["Description"] if isinstance(df["Description"].dtype, pd.CategoricalDtype) \
+                else df["Description"].astype("category")
+            cat_hash = pd.util.hash_array(desc.cat.categories.to_numpy(dtype=object))
+            codes = desc.cat.codes.to_numpy()
+            valid = codes >= 0
+            self.registers = hll_registers(groups[valid], len(table), cat_hash[codes[valid]], precision)
+
+    def select(self, countries=None, d_from=None, d_to=None):
+        return self.index.select(countries, d_from, d_to)
+
+    def merge(self, other):
+        """Gabungkan state partisi lain (mis. batch baru): momen via Chan, register HLL via max."""
+        a, b = self.index.df, other.index.df
+        both = pd.concat([a, b], ignore_index=True)
+        keys = [k for k in STATS_KEYS if k in both.columns]
+        groups, table = _group_codes(both, keys)
+        table = _merge_grouped(both, self.measures, groups, table)
+        table["part"] = np.arange(len(table))
+        if self.registers is not None and other.registers is not None:
+            regs = np.zeros((len(table), self.registers.shape[1]), dtype=np.uint8)
+            old = np.concatenate([self.registers[a["part"].to_numpy()], other.registers[b["part"].to_numpy()]])
+            np.maximum.at(regs, groups, old)
+            self.registers = regs
+        self.index = FilterIndex(table, date_col="Date")
+        return self
+
+    def correlation(self, countries=None, d_from=None, d_to=None):
+        parts = self.select(countries, d_from, d_to)
+        if len(self.measures) < 2:
+            return None
+        if parts.empty:   # sama dengan cube_corr: tidak ada baris yang cocok
+            return pd.DataFrame(columns=self.measures, dtype=float)
+        return moments_corr(merge_moments(parts, self.measures).iloc[0], self.measures)
+
+    def overview(self, countries=None, d_from=None, d_to=None):
+        """Ringkasan filter: baris & revenue (dari momen), produk ~HyperLogLog, negara exact."""
+        parts = self.select(countries, d_from, d_to)
+        total = merge_moments(parts, self.measures).iloc[0] if len(parts) else None
+        products = None
+        if self.registers is not None and len(parts):
+            products = int(round(float(hll_estimate(self.registers[parts["part"].to_numpy()].max(axis=0)))))
+        return {"rows": int(total["n"]) if total is not None else 0,
+                "products": products,
+                "countries": int(parts["Country"].nunique()) if "Country" in parts else None,
+                "revenue": float(total["n"] * total["mean:Revenue"]) if total is not None and "Revenue" in self.measures else 0.0}
+
+# ---------- Backend query: pandas (cube di memori) atau DuckDB (kolumnar, multi-thread) ----------
+class PandasBackend:
+    """Insight dari cube pandas lewat FilterIndex (perilaku dashboard selama ini).
+
+    Dengan stats (PartitionStats), korelasi diambil dari merge state partisi dan
+    view_insights menambah "selection" (ringkasan baris/produk/negara/revenue filter).
+    """
+    name = "pandas"
+
+    def __init__(self, source, stats=None):
+        if isinstance(source, FilterIndex):
+            self.index = source
+        else:
+            df = pd.read_parquet(source) if isinstance(source, str) else source
+            self.index = FilterIndex(df if "Count" in df.columns else build_cube(df), date_col="Date")
+        self.stats = stats
+
+    def view_insights(self, countries=None, d_from=None, d_to=None, executor=None):
+        cube_view = self.index.select(countries, d_from, d_to)
+        if self.stats is None:
+            return view_insights(cube_view, executor)
+        funcs = {name: fn for name, fn in VIEW_INSIGHTS.items() if name != "corr"}
+        return {**_run_insights(funcs, cube_view, executor),
+                "corr": self.stats.correlation(countries, d_from, d_to),
+                "selection": self.stats.overview(countries, d_from, d_to)}
+
+    def global_insights(self, executor=None):
+        return global_insights(self.index.df, executor)
+
+class DuckDBBackend:
+    """Insight via DuckDB langsung dari Parquet (snapshot locked/cube) atau DataFrame.
+
+    Filter jadi predicate WHERE (di-push ke scan Parquet), top-N jadi ORDER BY ... LIMIT
+    (operator top-K, tanpa sort penuh). Baris locked & sel cube sama-sama dibaca sebagai
+    sel (Count + jumlah measure), jadi hasil & logika korelasi identik dengan cube pandas.
+    """
+    name = "duckdb"
+
+    def __init__(self, source, threads=None):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("Backend duckdb butuh paket duckdb (pip install duckdb).") from e
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        # objek bernama (bukan register) agar terlihat dari cursor di thread lain
+        if isinstance(source, str):
+            path = source.replace("'", "''")
+            self.con.execute(f"CREATE VIEW source AS SELECT * FROM read_parquet('{path}')")
+        else:
+            self.con.register("source_df", source)
+            self.con.execute("CREATE TABLE source AS SELECT * FROM source_df")   # salinan kolumnar DuckDB
+            self.con.unregister("source_df")
+        table = self.con.table("source")
+        self.columns = table.columns
+        # kolom integer sumber (mis. Quantity int32; float bila ada nilai pecahan) -> SUM tetap BIGINT
+        self.int_cols = {c for c, t in zip(table.columns, table.types)
+                         if str(t) in ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT")}
+        self.is_cube = "Count" in self.columns
+        self.measures = [m for m in CUBE_MEASURES if m in self.columns]
+        if self.is_cube:
+            date = '"Date"'
+        else:
+            date = 'CAST(date_trunc(\'day\', "InvoiceDate") AS TIMESTAMP)'
+        # baris locked sudah punya Year/Month; turunkan dari InvoiceDate hanya bila tidak ada
+        year = '"Year"' if "Year" in self.columns else 'year("InvoiceDate")'
+        month = '"Month"' if "Month" in self.columns else 'month("InvoiceDate")'
+        self.expr = {"Date": date, "Year": year, "Month": month,
+                     "Country": 'CAST("Country" AS VARCHAR)', "Description": 'CAST("Description" AS VARCHAR)'}
+
+    def _measure(self, a, b=None):
+        """Ekspresi SUM untuk measure a (atau cross-product a*b); integer tetap BIGINT.
+
+        SUM(BIGINT) di DuckDB bertipe HUGEINT (sampai di pandas sebagai float64), jadi hasil
+        SUM-nya sendiri di-cast ke BIGINT agar dtype sama dengan cube pandas (int64).
+        """
+        if b is None:
+            t = self._type(a)
+        elif self.is_cube:
+            t = self._type(f"{a}*{b}")
+        else:
+            t = "BIGINT" if self._type(a) == self._type(b) == "BIGINT" else "DOUBLE"
+        if b is None:
+            value, name = f'CAST("{a}" AS {t})', a
+        elif self.is_cube:
+            value, name = f'"{a}*{b}"', f"{a}*{b}"
+        else:
+            value, name = f'CAST("{a}" AS {t}) * CAST("{b}" AS {t})', f"{a}*{b}"
+        return f'CAST(SUM({value}) AS {t}) AS "{name}"'
+
+    def _type(self, col):
+        return "BIGINT" if col in self.int_cols else "DOUBLE"
+
+    def _count(self):
+        return 'CAST(SUM("Count") AS BIGINT)' if self.is_cube else "COUNT(*)"
+
+    def _where(self, countries=None, d_from=None, d_to=None, extra=()):
+        conds, params = list(extra), []
+        if countries:
+            conds.append(f'list_contains(?, {self.expr["Country"]})')
+            params.append([str(c) for c in countries])
+        if d_from is not None and d_to is not None and "Date" in self.expr:
+            conds.append(f'{self.expr["Date"]} >= ? AND {self.expr["Date"]} < ?')
+            params += [pd.Timestamp(d_from).to_pydatetime(), (pd.Timestamp(d_to) + pd.Timedelta(days=1)).to_pydatetime()]
+        return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+    def _query(self, select, where, group=None, order=None, limit=None):
+        sql = f"SELECT {select} FROM source{where[0]}"
+        if group:
+            sql += f" GROUP BY {group} HAVING {group} IS NOT NULL"   # groupby pandas membuang kunci NaN
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        # cursor per query: aman dipanggil bersamaan dari thread pool
+        return self.con.cursor().execute(sql, where[1]).df()
+
+    def top_countries(self, where, n=5):
+        if "Country" not in self.columns:
+            return None
+        return self._query(f'{self.expr["Country"]} AS "Country", {self._measure("Revenue")}', where,
+                           group='"Country"', order='"Revenue" DESC, "Country"', limit=n)
+
+    def top_products(self, where, n=10):
+        if not {"Description", "Quantity"}.issubset(self.columns):
+            return None
+        return self._query(f'{self.expr["Description"]} AS "Description", {self._measure("Quantity")}', where,
+                           group='"Description"', order='"Quantity" DESC, "Description"', limit=n)
+
+    def transactions_per_hour(self, where):
+        if "Hour" not in self.columns:
+            return None
+        hours = self._query(f'CAST("Hour" AS INTEGER) AS "Hour", {self._count()} AS "Count"', where, group='"Hour"')
+        return hours.set_index("Hour")["Count"].reindex(range(24), fill_value=0).rename_axis("Hour")
+
+    def monthly_revenue(self, where, year=2011):
+        if "InvoiceDate" not in self.columns and not {"Year", "Month"}.issubset(self.columns):
+            return None
+        where = (where[0] + (" AND " if where[0] else " WHERE ") + f'{self.expr["Year"]} = ?', where[1] + [year])
+        revenue = self._query(f'CAST({self.expr["Month"]} AS INTEGER) AS "Month", {self._measure("Revenue")}',
+                              where, group='"Month"', order='"Month"')
+        revenue.insert(1, "Month_Name", revenue["Month"].map(MONTH_MAP))
+        return revenue
+
+    def correlation(self, where):
+        if len(self.measures) < 2:
+            return None
+        sums = [f'{self._count()} AS "Count"'] + [self._measure(a) for a in self.measures]
+        sums += [self._measure(a, b) for i, a in enumerate(self.measures) for b in self.measures[i:]]
+        return cube_corr(self._query(", ".join(sums), where), self.measures)
+
+    def view_insights(self, countries=None, d_from=None, d_to=None, executor=None):
+        where = self._where(countries, d_from, d_to)
+        funcs = {"top5_view": self.top_countries, "top_product_view": self.top_products,
+                 "trx_hour": self.transactions_per_hour, "year_revenue": self.monthly_revenue,
+                 "corr": self.correlation}
+        return _run_insights(funcs, where, executor)
+
+    def global_insights(self, executor=None):
+        none = self._where()
+        nov = self._where(extra=[f'{self.expr["Month"]} = 11'])
+        row = self._query(f'{self._count()} AS "rows", SUM(CAST("Revenue" AS DOUBLE)) AS "revenue"'
+                          + (', COUNT(DISTINCT "Description") AS "products"' if "Description" in self.columns else "")
+                          + (', COUNT(DISTINCT "Country") AS "countries"' if "Country" in self.columns else ""),
+                          none).iloc[0]
+        return {
+            "overview": {"rows": int(row["rows"]),
+                         "products": int(row["products"]) if "products" in row else None,
+                         "countries": int(row["countries"]) if "countries" in row else None,
+                         "revenue": float(row["revenue"])},
+            "top_all": self.top_products(none),
+            "prod_nov": self.top_products(nov),
+        }
+
+QUERY_BACKENDS = {"pandas": PandasBackend, "duckdb": DuckDBBackend}
+
+def make_backend(name, source, **kwargs):
+    """Backend query berdasarkan nama (lihat QUERY_BACKENDS); source: cube/DataFrame/path Parquet."""
+    if name not in QUERY_BACKENDS:
+        raise ValueError(f"Unknown query backend: {name!r}")
+    return QUERY_BACKENDS[name](source, **kwargs)
+
+
+# ---------- Profiling per tahap (debug) ----------
+class _NullStage:
+    """Tahap no-op saat profiling mati: tanpa timer, tanpa alokasi per pemanggilan."""
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+# tracemalloc global untuk semua sesi: dinyalakan saat profiler pertama butuh, dimatikan saat
+# profiler terakhir selesai -- hanya bila tracing memang dinyalakan di sini, bukan oleh pihak lain
+_TRACE_LOCK = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+def _acquire_trace():
+    global _trace_users, _trace_owned
+    with _TRACE_LOCK:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+        _trace_users += 1
+
+def _release_trace():
+    global _trace_users, _trace_owned
+    with _TRACE_LOCK:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()   # tracing global memperlambat semua alokasi
+            _trace_owned = False
+
+class _Stage:
+    def __init__(self, profiler, name, rows_in, cached):
+        self.profiler, self.rows_out = profiler, None
+        self.record = {"stage": name, "rows_in": rows_in, "cache": "hit" if cached else None}
+
+    def __enter__(self):
+        self.profiler._current = self
+        if self.profiler.trace_memory:
+            tracemalloc.reset_peak()
+            self._mem0 = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record["ms"] = (time.perf_counter() - self._t0) * 1000
+        if self.profiler.trace_memory:
+            # sesi lain bisa reset_peak di tengah tahap: hasil didekati, tidak pernah negatif
+            self.record["peak_mb"] = max(tracemalloc.get_traced_memory()[1] - self._mem0, 0) / 1024**2
+        self.record["rows_out"] = self.rows_out
+        self.profiler.records.append(self.record)
+        self.profiler._current = None
+        return False
+
+class StageProfiler:
+    """Catat waktu, baris in/out, puncak memori (tracemalloc) & cache hit/miss per tahap.
+
+    Saat enabled=False, stage() mengembalikan objek no-op yang sama sehingga biayanya
+    hanya satu pemanggilan fungsi. Tracing memori (refcount lintas sesi) dipegang sejak
+    dibuat sampai close(); `with profiler:` memegangnya lagi untuk satu blok. Profiler
+    tanpa tracing tidak pernah mematikannya.
+    """
+
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled, self.records, self._current = enabled, [], None
+        self.trace_memory = enabled and trace_memory
+        self._release = None
+        self._hold()
+
+    def _hold(self):
+        if self.trace_memory and (self._release is None or not self._release.alive):
+            _acquire_trace()
+            # cadangan bila close() terlewat; finalize hanya jalan sekali (close() atau GC)
+            self._release = weakref.finalize(self, _release_trace)
+
+    def close(self):
+        """Lepas tracing memori sekarang (idempotent), tanpa menunggu garbage collector."""
+        if self._release is not None:
+            self._release()
+
+    def __enter__(self):
+        self._hold()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def stage(self, name, rows_in=None, cached=False):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows_in, cached)
+
+    def mark_miss(self):
+        """Dipanggil dari dalam fungsi ber-cache: body-nya jalan berarti cache miss."""
+        if self._current is not None:
+            self._current.record["cache"] = "miss"
+
+    def frame(self):
+        cols = ["stage", "ms", "rows_in", "rows_out", "peak_mb", "cache"]
+        return pd.DataFrame(self.records).reindex(columns=cols)
+
+    def write_log(self, path, **meta):
+        with open(path, "a") as f:
+            for r in self.records:
+                f.write(json.dumps({**meta, **r}, default=str) + "\n")
+
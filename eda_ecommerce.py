@@ -1,113 +1,317 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import StrMethodFormatter
-import seaborn as sns
 from datetime import date
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from eda_core import (
+    DATE_FORMAT, MONTH_MAP, OUTLIER_BY, OUTLIER_COLS, OUTLIER_MODE, PREVIEW_MIN_CELLS, STREAM_APPROX_QUANTILES,
+    STREAM_MIN_BYTES, TOPK_CAPACITY, DatasetManager, FilterIndex, LockedStore, PandasBackend, PartitionStats,
+    ProductTopK, StageProfiler, StratifiedSample, basket_pairs, build_basket_lines, build_cube,
+    build_customer_cube, csv_shape, customer_rfm, file_fingerprint, load_csv, load_locked, load_stream_aggregates,
+    make_backend, memory_report, rfm_segments, snapshot_path, top_bundles,
+)
+from eda_charts import (
+    FigureCache, plot_correlation, plot_monthly_revenue, plot_rfm_segments, plot_top_bundles,
+    plot_top_countries, plot_top_products, plot_transactions_per_hour,
+)
 
 st.set_page_config(page_title="EDA Ecommerce", layout="wide")
 st.title("Exploratory Data Analysis of Online Retail Dataset")
 
+# profiling per tahap (toggle debug di sidebar); saat mati stage() hanya no-op
+PROFILE_LOG = "profile_log.jsonl"
+
+# mesin query agregasi: "pandas" (cube di memori) atau "duckdb" (pip install duckdb; query Parquet)
+QUERY_BACKEND = "pandas"
+
+# parameter CLEAN & LOCK; ikut jadi kunci cache -> ubah di sini, dataset dibangun ulang
+CLEAN_PARAMS = {"date_format": DATE_FORMAT, "outlier_cols": OUTLIER_COLS, "outlier_mode": OUTLIER_MODE,
+                "outlier_by": OUTLIER_BY}
+
+# jumlah dataset (fingerprint) yang turunannya (locked, cube, index, backend, sampel) disimpan per proses;
+# ganti/upload dataset lain -> yang paling lama tak dipakai dibuang
+CACHED_DATASETS = 4
+# profiler run sebelumnya di sesi ini (mis. berhenti di st.stop) dilepas sekarang, bukan menunggu GC
+if "profiler" in st.session_state:
+    st.session_state["profiler"].close()
+profiler = st.session_state["profiler"] = StageProfiler(enabled=st.session_state.get("debug_profiling", False))
+
 # ---------- helpers -----------
+# cache per proses: fungsi core dibungkus di sini agar eda_core tetap bebas Streamlit.
+# profiler.mark_miss() hanya jalan bila body dieksekusi -> stage tercatat sebagai cache miss.
 @st.cache_data(show_spinner=False)
-def load_csv(path_or_file):
-    return pd.read_csv(path_or_file, encoding_errors="ignore")
-
-def apply_outlier_filter(df, cols):
-    clean = df.copy()
-    for c in cols:
-        if c not in clean.columns:
-            continue
-        s = pd.to_numeric(clean[c], errors="coerce")
-        q1, q3 = s.quantile(0.25), s.quantile(0.75)
-        iqr = q3 - q1
-        lo, hi = q1 - 1.5*iqr, q3 + 1.5*iqr
-        clean = clean[(s >= lo) & (s <= hi)]
-    return clean
-
-def annotate_bars(ax, fmt="{:.0f}"):
-    for c in ax.containers:
-        ax.bar_label(c, fmt=fmt, padding=3)
-
-sns.set_style("whitegrid")
+def fingerprint_file(path, size=None, mtime_ns=None):
+    profiler.mark_miss()
+    return file_fingerprint(path, size, mtime_ns)
+
+# cache_resource: objek yang sama dipakai ulang tiap rerun (tanpa pickle/copy) -> jangan dimutasi.
+# fingerprint ikut jadi kunci cache: isi file berubah -> dibangun ulang.
+@st.cache_resource(show_spinner="Cleaning dataset...", max_entries=CACHED_DATASETS)
+def build_locked(path, fingerprint, date_format, outlier_cols, outlier_mode, outlier_by):
+    profiler.mark_miss()
+    return load_locked(path, fingerprint, date_format=date_format, outlier_cols=outlier_cols,
+                       outlier_mode=outlier_mode, outlier_by=outlier_by)
+
+@st.cache_resource
+def dataset_manager():
+    # satu store partisi clean per proses (semua sesi): file yang sama tidak di-parse ulang
+    return DatasetManager()
+
+@st.cache_resource(show_spinner="Cleaning dataset...", max_entries=CACHED_DATASETS)
+def build_dataset(fingerprint, _sources, date_format, outlier_cols, outlier_mode, outlier_by):
+    # _sources (upload/path) tidak di-hash; isi diwakili fingerprint sampel blok
+    profiler.mark_miss()
+    _, df, shape = dataset_manager().load(_sources, date_format=date_format, outlier_cols=outlier_cols,
+                                          outlier_mode=outlier_mode, outlier_by=outlier_by)
+    return df, shape
 
-# ============ Data Input ============
-
-df = load_csv("ecommerce.csv")
+@st.cache_data(show_spinner=False)
+def source_shape(path, fingerprint):
+    profiler.mark_miss()
+    return csv_shape(path)
+
+@st.cache_resource(show_spinner="Building aggregates...", max_entries=CACHED_DATASETS)
+def build_cube_index(fingerprint, _df):
+    profiler.mark_miss()
+    return FilterIndex(build_cube(_df), date_col="Date")
+
+@st.cache_resource(show_spinner="Streaming dataset...", max_entries=CACHED_DATASETS)
+def build_stream_index(path, fingerprint, date_format, outlier_cols, outlier_mode, outlier_by,
+                       approx=STREAM_APPROX_QUANTILES):
+    profiler.mark_miss()
+    cube, sample = load_stream_aggregates(path, fingerprint, date_format=date_format, outlier_cols=outlier_cols,
+                                          outlier_mode=outlier_mode, outlier_by=outlier_by, approx=approx)
+    return FilterIndex(cube, date_col="Date"), sample
+
+@st.cache_resource(show_spinner="Loading dataset store...", max_entries=CACHED_DATASETS)
+def build_store_locked(root, revision):
+    profiler.mark_miss()
+    return LockedStore(root).locked()
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_store_cube_index(root, revision):
+    profiler.mark_miss()
+    return FilterIndex(LockedStore(root).cube(), date_col="Date")
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_store_head(root, revision):
+    profiler.mark_miss()
+    return LockedStore(root).head(20)
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_backend(name, fingerprint, _cube_index, snapshot=None):
+    profiler.mark_miss()
+    if name == "pandas":
+        # pakai ulang cube & index yang sudah di-cache; korelasi & ringkasan filter dari state per hari x negara
+        return PandasBackend(_cube_index, stats=PartitionStats(_cube_index.df))
+    return make_backend(name, snapshot if snapshot and os.path.exists(snapshot) else _cube_index.df)
+
+@st.cache_resource(show_spinner="Building customer aggregates...", max_entries=CACHED_DATASETS)
+def build_customer_index(fingerprint, _df):
+    # sel (CustomerID, Date, Country) -> filter sidebar sama dengan cube
+    profiler.mark_miss()
+    cells = build_customer_cube(_df)
+    return None if cells is None else FilterIndex(cells, date_col="Date")
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_basket_index(fingerprint, _df):
+    # baris unik (InvoiceNo, Description) + Date/Country -> filter sidebar sama dengan cube
+    profiler.mark_miss()
+    lines = build_basket_lines(_df)
+    return None if lines is None else FilterIndex(lines, date_col="Date")
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_preview_sample(fingerprint, _cube):
+    # sampel dibuat sekali per dataset locked; ganti filter hanya memilih baris sampel
+    profiler.mark_miss()
+    return StratifiedSample(_cube)
+
+@st.cache_resource(show_spinner=False, max_entries=CACHED_DATASETS)
+def build_product_topk(fingerprint, _cube):
+    profiler.mark_miss()
+    return ProductTopK.from_frame(_cube, TOPK_CAPACITY)
+
+# satu cache gambar per proses (dipakai semua sesi), dibatasi jumlah entri & ukuran
+chart_cache = st.cache_resource(FigureCache)()
+
+@st.cache_resource
+def insight_pool():
+    # agregasi ber-filter saling independen -> dihitung bersamaan (pandas melepas GIL di kernel numerik)
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="insight")
+
+@st.cache_resource
+def exact_pool():
+    # insight exact mode preview dihitung di sini (bukan di insight_pool: task di pool itu ikut menunggu)
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="exact")
+
+def show_chart(chart_id, plot, data, **kwargs):
+    # grafik dengan input agregat yang sama -> gambar dari cache, tanpa matplotlib
+    with profiler.stage(f"chart: {chart_id}", rows_in=len(data), cached=True):
+        img = chart_cache.image(chart_id, plot, data, on_miss=profiler.mark_miss, **kwargs)
+    st.image(img, width="stretch")
 
-# ---------- CLEAN & LOCK (tanpa outlier) ----------
-df = df.copy()
+# ============ Data Input ============
+DATA_PATH = "ecommerce.csv"
 
-if "Country" in df.columns:
-    df["Country"] = df["Country"].replace("Unspecified", "United Kingdom")
+DATA_STORE = os.path.splitext(DATA_PATH)[0] + ".store"   # dibuat saat batch pertama di-append
 
-# Numerik & revenue
-if "Quantity" in df.columns:
-    df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce")
-if "UnitPrice" in df.columns:
-    df["UnitPrice"] = pd.to_numeric(df["UnitPrice"], errors="coerce")
-if "Revenue" not in df.columns:
-    if {"UnitPrice", "Quantity"}.issubset(df.columns):
-        df["Revenue"] = df["UnitPrice"] * df["Quantity"]
-    else:
-        st.error("Need UnitPrice & Quantity to compute Revenue.")
+with st.sidebar:
+    # dataset lain: folder partisi CSV (mis. export bulanan) atau upload; default ecommerce.csv
+    st.header("Dataset")
+    source_kind = st.radio("Sumber data", [DATA_PATH, "Folder CSV", "Upload CSV"], key="dataset_source")
+    sources = None
+    if source_kind == "Folder CSV":
+        folder = st.text_input("Folder partisi CSV", key="dataset_dir")
+        if folder:
+            try:
+                sources = DatasetManager.directory_sources(folder)
+            except (OSError, ValueError) as e:
+                st.error(str(e))
+    elif source_kind == "Upload CSV":
+        sources = st.file_uploader("CSV (skema sama dengan ecommerce.csv)", type="csv",
+                                   accept_multiple_files=True, key="dataset_upload") or None
+    if source_kind != DATA_PATH and sources is None:
+        st.info("Pilih folder atau upload file CSV.")
         st.stop()
 
-# Datetime fields
-if "InvoiceDate" in df.columns:
-    df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"], errors="coerce")
-    df["Month"] = df["InvoiceDate"].dt.month
-    df["Year"] = df["InvoiceDate"].dt.year
-    df["Hour"] = df["InvoiceDate"].dt.hour
-    df["DayOfWeek_Name"] = df["InvoiceDate"].dt.day_name()
-    month_map = {1:"January",2:"February",3:"March",4:"April",5:"May",6:"June",7:"July",8:"August",9:"September",10:"October",11:"November",12:"December"}
-    df["Month_Name"] = df["Month"].map(month_map)
-
-# Description hygiene
-if "Description" in df.columns:
-    df = df[df["Description"].notna()].copy()
-    df["Description"] = df["Description"].astype(str).str.strip()
-
-# LOCK: remove returns/cancellations
-if "Quantity" in df.columns:
-    df = df[df["Quantity"] > 0]
-if "InvoiceNo" in df.columns:
-    df = df[~df["InvoiceNo"].astype(str).str.startswith("C")]
-
-# LOCK: remove outliers (IQR) globally on Quantity & UnitPrice
-cols_for_outlier = [c for c in ["Quantity","UnitPrice"] if c in df.columns]
-df_locked = apply_outlier_filter(df, cols_for_outlier) if cols_for_outlier else df.copy()
+# ---------- CLEAN & LOCK (tanpa outlier, di-cache per isi file & parameter) ----------
+_stat = None   # stat ecommerce.csv hanya untuk sumber default: folder/upload tetap jalan tanpa file itu
+if sources is None:
+    try:
+        _stat = os.stat(DATA_PATH)
+    except FileNotFoundError:
+        if not LockedStore.exists(DATA_STORE):
+            st.error(f"{DATA_PATH} tidak ditemukan; pilih Folder CSV atau Upload CSV di sidebar.")
+            st.stop()
+rows_note = ""   # keterangan baris mentah (mode store: termasuk batch append)
+stream_mode = _stat is not None and _stat.st_size > STREAM_MIN_BYTES   # file besar: hanya agregat + sampel
+try:
+    if sources is not None:
+        # partisi di-clean sekali per isi file (store proses), outlier di-lock pada gabungannya
+        with profiler.stage("fingerprint", cached=False):
+            data_fp = dataset_manager().fingerprint(sources)[0]
+        with profiler.stage("clean & lock", cached=True) as stg:
+            df_locked, raw_shape = build_dataset(data_fp, sources, **CLEAN_PARAMS)
+            stg.rows_out = len(df_locked)
+        with profiler.stage("cube", rows_in=len(df_locked), cached=True) as stg:
+            cube_index = build_cube_index(data_fp, df_locked)
+            stg.rows_out = len(cube_index.df)
+        sample_rows = df_locked.head(20)
+    elif LockedStore.exists(DATA_STORE):
+        # histori + batch yang sudah di-append; revisi store menggantikan fingerprint CSV
+        store = LockedStore(DATA_STORE)
+        data_fp, raw_shape = store.revision, store.raw_shape()
+        rows_note = " (CSV awal + batch append)" if raw_shape is not None else ""
+        if _stat is not None:
+            with profiler.stage("fingerprint", cached=True):
+                csv_fp = fingerprint_file(DATA_PATH, _stat.st_size, _stat.st_mtime_ns)
+        if _stat is not None and store.source_fingerprint not in (None, csv_fp):
+            st.warning(f"{DATA_PATH} berubah sejak store {DATA_STORE} dibuat; dashboard tetap memakai store "
+                       f"(CSV awal + batch append). Hapus folder {DATA_STORE} untuk membangun ulang dari CSV.")
+        if stream_mode:
+            # CSV besar: seperti mode streaming, hanya cube store + beberapa baris, tanpa baris locked
+            df_locked = None
+            with profiler.stage("store: cube", cached=True) as stg:
+                cube_index = build_store_cube_index(DATA_STORE, data_fp)
+                stg.rows_out = len(cube_index.df)
+            sample_rows = build_store_head(DATA_STORE, data_fp)
+        else:
+            with profiler.stage("store: locked", cached=True) as stg:
+                df_locked = build_store_locked(DATA_STORE, data_fp)
+                stg.rows_out = len(df_locked)
+            with profiler.stage("store: cube", rows_in=len(df_locked), cached=True) as stg:
+                cube_index = build_store_cube_index(DATA_STORE, data_fp)
+                stg.rows_out = len(cube_index.df)
+            sample_rows = df_locked.head(20)
+    else:
+        raw_shape = None   # dihitung dari CSV di bagian Dataset Information
+        with profiler.stage("fingerprint", cached=True):
+            data_fp = fingerprint_file(DATA_PATH, _stat.st_size, _stat.st_mtime_ns)
+        if stream_mode:
+            df_locked = None
+            with profiler.stage("stream: aggregates", cached=True) as stg:
+                cube_index, sample_rows = build_stream_index(DATA_PATH, data_fp, **CLEAN_PARAMS)
+                stg.rows_out = len(cube_index.df)
+        else:
+            with profiler.stage("clean & lock", cached=True) as stg:
+                df_locked = build_locked(DATA_PATH, data_fp, **CLEAN_PARAMS)
+                stg.rows_out = len(df_locked)
+            # semua grafik Business Insight membaca cube (sel agregat), bukan baris mentah
+            with profiler.stage("cube", rows_in=len(df_locked), cached=True) as stg:
+                cube_index = build_cube_index(data_fp, df_locked)
+                stg.rows_out = len(cube_index.df)
+            sample_rows = df_locked.head(20)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+cube = cube_index.df
+if sources is not None or LockedStore.exists(DATA_STORE):
+    _snapshot = None   # upload/folder, store: tanpa snapshot -> backend membaca cube di memori
+else:
+    _snapshot = snapshot_path(DATA_PATH, "cube" if stream_mode else "locked")
+with profiler.stage(f"backend: {QUERY_BACKEND}", cached=True):
+    backend = build_backend(QUERY_BACKEND, data_fp, cube_index, _snapshot)
 
 # ============ Sidebar: FILTERS ============
-with st.sidebar:
-    st.header("Filters")
 
+def filter_widgets():
     # Country filter
-    countries = sorted(df_locked["Country"].dropna().astype(str).unique()) \
-                if "Country" in df_locked.columns else []
+    countries = cube_index.countries
     country_sel = st.multiselect("Country (kosongkan = semua)", countries, default=[])
 
     # Date range (opsional) — inisialisasi aman
     d_from, d_to = None, None
-    if "InvoiceDate" in df_locked.columns:
-        min_dt = df_locked["InvoiceDate"].min()
-        max_dt = df_locked["InvoiceDate"].max()
-        if pd.notna(min_dt) and pd.notna(max_dt):
-            min_d, max_d = min_dt.date(), max_dt.date()
-            dr = st.date_input("Date range", value=(min_d, max_d),
-                               min_value=min_d, max_value=max_d)
-            if isinstance(dr, tuple) and len(dr) == 2:
-                d_from, d_to = dr
-
-# ============ Apply filters ke VIEW (grafik) ============
-df_view = df_locked.copy()
-if country_sel:
-    df_view = df_view[df_view["Country"].astype(str).isin(country_sel)]
-
-if (d_from is not None) and (d_to is not None) and ("InvoiceDate" in df_view.columns):
-    mask = (df_view["InvoiceDate"].dt.date >= d_from) & (df_view["InvoiceDate"].dt.date <= d_to)
-    df_view = df_view[mask]
+    min_dt, max_dt = cube_index.date_bounds()
+    if min_dt is not None:
+        min_d, max_d = min_dt.date(), max_dt.date()
+        dr = st.date_input("Date range", value=(min_d, max_d),
+                           min_value=min_d, max_value=max_d)
+        if isinstance(dr, tuple) and len(dr) == 2:
+            d_from, d_to = dr
+    return country_sel, d_from, d_to
+
+with st.sidebar:
+    # widget filter ditulis oleh fragment filtered_insights -> mengubah filter hanya
+    # menjalankan ulang bagian ber-filter, bukan seluruh halaman
+    filters_box = st.container()
+    filters_box.header("Filters")
+
+    # Append transaksi baru (incremental, tanpa rebuild histori); hanya untuk ecommerce.csv
+    if sources is None:
+        with st.expander("Append transaksi baru"):
+            batch_file = st.file_uploader("CSV batch (skema sama dengan ecommerce.csv)", type="csv")
+            if batch_file is not None and st.button("Append"):
+                if LockedStore.exists(DATA_STORE):
+                    summary = LockedStore(DATA_STORE).append(load_csv(batch_file))
+                else:
+                    # store awal dibangun per chunk dari CSV (tidak memuat seluruh file)
+                    store = LockedStore.from_csv(DATA_STORE, DATA_PATH, source_fingerprint=data_fp, **CLEAN_PARAMS)
+                    summary = store.append(load_csv(batch_file))
+                # tanpa clear cache: locked/cube store di-cache per revisi, revisi baru -> dibangun ulang
+                st.session_state["append_summary"] = summary
+                st.rerun()
+            summary = st.session_state.pop("append_summary", None)
+            if summary:
+                st.success(f"{summary['rows']:,} baris ditambahkan"
+                           + (f"; re-lock {summary['changed_rows']:,} baris (dari {summary['scanned_rows']:,} baris histori dibaca)"
+                              if summary["relocked"] else "") + ".")
+
+    st.divider()
+    fast_preview = st.toggle("Fast preview (sampel)", value=len(cube) >= PREVIEW_MIN_CELLS, key="fast_preview",
+                             help="Grafik 1–4 tampil dulu dari sampel berstrata (dengan CI 95%), "
+                                  "lalu diganti hasil exact begitu selesai dihitung.")
+    st.toggle("Debug: profiling", key="debug_profiling",
+              help="Catat waktu, baris, puncak memori & cache hit/miss per tahap.")
+    if profiler.enabled:
+        log_profile = st.checkbox(f"Tulis ke {PROFILE_LOG}", key="debug_profile_log")
+
+preview_sample = None
+if fast_preview and "Country" in cube.columns:
+    with profiler.stage("preview sample", rows_in=len(cube), cached=True) as stg:
+        preview_sample = build_preview_sample(data_fp, cube)
+        stg.rows_out = len(preview_sample.index.df)
 
 st.header("About Me")
 
@@ -148,10 +352,16 @@ st.subheader("Dataset Information")
 st.markdown(
       "Data e-commerce yang berisi semua transaksi yang terjadi antara 01/12/2010 hingga 09/12/2011 untuk online retail yang terdaftar dan berbasis di Inggris Raya."
 )
+with profiler.stage("source shape", cached=True) as stg:
+    if raw_shape is not None:
+        raw_rows, raw_cols = raw_shape
+    else:
+        raw_rows, raw_cols = source_shape(DATA_PATH, fingerprint_file(DATA_PATH, _stat.st_size, _stat.st_mtime_ns))
+    stg.rows_out = raw_rows
 st.markdown(
-    "🧾 Rows : 4.870")
+    f"🧾 Rows : {raw_rows:,}".replace(",", ".") + rows_note)
 st.markdown(
-    "🧱 Columns : 8")
+    f"🧱 Columns : {raw_cols}")
 
 st.subheader("Dataset Column Description")
 
@@ -165,229 +375,75 @@ data = [
     {"Kolom":"📦 Quantity","Tipe":"int","Deskripsi":"Jumlah produk dalam satu transaksi."},
     {"Kolom":"💲 UnitPrice","Tipe":"float","Deskripsi":"Harga per unit produk."},
     {"Kolom":"💰 Revenue","Tipe":"float","Deskripsi":"Total pendapatan per baris (UnitPrice × Quantity)."},
-    {"Kolom":"🗓️ Month_Name","Tipe":"string","Deskripsi":"Nama bulan hasil turunan dari InvoiceDate."},
+    {"Kolom":"🗓️ Month","Tipe":"int (1–12)","Deskripsi":"Bulan dari InvoiceDate; nama bulan diturunkan saat ditampilkan."},
     {"Kolom":"📆 Year","Tipe":"int","Deskripsi":"Tahun hasil turunan dari InvoiceDate."},
     {"Kolom":"⏰ Hour","Tipe":"int (0–23)","Deskripsi":"Jam transaksi (0–23) dari InvoiceDate."},
-    {"Kolom":"🗓️ DayOfWeek_Name","Tipe":"string","Deskripsi":"Nama hari dalam seminggu dari InvoiceDate."},
+    {"Kolom":"🗓️ DayOfWeek","Tipe":"int (0–6)","Deskripsi":"Hari dalam seminggu dari InvoiceDate (0 = Senin)."},
 ]
 
 schema_df = pd.DataFrame(data, columns=["Kolom","Tipe","Deskripsi"])
-st.dataframe(schema_df, use_container_width=True, hide_index=True)
+st.dataframe(schema_df, width="stretch", hide_index=True)
 
 
 # ---------- Overview ----------
 st.subheader("Dataset Overview")
 c1, c2, c3, c4 = st.columns(4)
-c1.metric("Rows", f"{len(df_locked):,}")
-c2.metric("Unique Products", f"{df_locked['Description'].nunique():,}" if 'Description' in df_locked else "–")
-c3.metric("Countries", f"{df_locked['Country'].nunique():,}" if 'Country' in df_locked else "–")
-c4.metric("Total Revenue", f"{df_locked['Revenue'].sum():,.2f}")
-with st.expander("Sample rows (locked dataset)"):
-    st.dataframe(df_locked.head(20))
+with profiler.stage("agg: global insights", rows_in=len(cube)):
+    glob = backend.global_insights()   # tidak bergantung filter: dihitung di full run saja
+ov = glob["overview"]
+c1.metric("Rows", f"{ov['rows']:,}")
+c2.metric("Unique Products", f"{ov['products']:,}" if ov['products'] is not None else "–")
+c3.metric("Countries", f"{ov['countries']:,}" if ov['countries'] is not None else "–")
+c4.metric("Total Revenue", f"{ov['revenue']:,.2f}")
+with st.expander("Sample rows (locked dataset)" if df_locked is not None or _snapshot is None
+                 else f"Sample rows (reservoir {len(sample_rows):,} dari dataset locked)"):
+    st.dataframe(sample_rows)
 
 st.header("Business Insight")
+# judul ditulis di full run; isi bagian ber-filter ditulis oleh fragment filtered_insights
+box_selection = st.container()   # ringkasan filter aktif (backend pandas: merge state partisi)
 # ============ 1) Revenue by Country ============
-st.subheader("Country mana dengan pendapatan tertinggi dan terendah?")
-if "Country" in df_view.columns:
-    top5_view = (df_view.groupby("Country", as_index=False)["Revenue"].sum()
-                           .sort_values("Revenue", ascending=False).head(5))
-
-    # override style hanya untuk plot ini (tanpa grid)
-    with sns.axes_style("white"):
-        fig, ax = plt.subplots(figsize=(9, 4))
-        sns.barplot(
-            y="Country", x="Revenue", data=top5_view, ax=ax,
-            palette=sns.color_palette("mako", n_colors=len(top5_view))
-        )
-
-        # hilangkan grid & rapikan tampilan
-        ax.grid(False)
-        for s in ["top", "right", "left"]:
-            ax.spines[s].set_visible(False)
-        ax.spines["bottom"].set_color("#E5E7EB")
-
-        ax.set_title("Top 5 Sales Performance per Country")
-        ax.xaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))  # 1,000 format
-        ax.margins(x=0.02)
-
-        annotate_bars(ax, fmt="{:,.0f}")
-        plt.tight_layout()
-        st.pyplot(fig)
-
-    st.markdown(
-        "Pendapatan tertinggi diperoleh di Negara United Kingdom dengan jumlah "
-        "pendapatan 44,942."
-    )
-else:
-    st.info("Column 'Country' not found.")
+box_country = st.container()
+box_country.subheader("Country mana dengan pendapatan tertinggi dan terendah?")
 
 # ============ 2) Top Products by Quantity ============
-st.subheader("Produk kategori apa yang paling diminati oleh konsumen berdasarkan banyaknya pembelian?")
-if {"Description","Quantity"}.issubset(df_view.columns):
-    top_product_view = (
-        df_view.groupby("Description", as_index=False)["Quantity"].sum()
-               .sort_values("Quantity", ascending=False).head(10)
-    )
-
-    # plot tanpa grid + palette mako
-    with sns.axes_style("white"):
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.barplot(
-            y="Description", x="Quantity",
-            data=top_product_view, ax=ax,
-            palette=sns.color_palette("mako", n_colors=len(top_product_view))
-        )
-
-        ax.grid(False)  # matikan grid
-        for s in ["top", "right", "left"]:
-            ax.spines[s].set_visible(False)
-        ax.spines["bottom"].set_color("#E5E7EB")
-        ax.set_title("Top Sales Product")
-        ax.set_ylabel("")  # rapikan label Y
-        ax.xaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))  # format ribuan
-        ax.margins(x=0.02)
-
-        annotate_bars(ax, fmt="{:.0f}")
-        plt.tight_layout()
-        st.pyplot(fig)
-
-    # Insight dari seluruh data (locked)
-    top_all = (df_locked.groupby("Description", as_index=False)["Quantity"].sum()
-                        .sort_values("Quantity", ascending=False).head(10))
-    top1 = top_all.iloc[0]
-    share_top10 = top_all["Quantity"].sum() / df_locked["Quantity"].sum()
-
-    st.markdown(
-        "Produk dengan penjualan tertinggi yaitu 60 TEATIME FAIRY CAKE CASES yang "
-        "terjual hingga 249 buah. Barang lain yang menjadi top sales yaitu peralatan "
-        "dapur/baking (cake cases, jelly moulds, jam set), dekorasi dan seasonal items "
-        "(bunting, Christmas ornament, glass T-light), dan produk serbaguna/hadiah "
-        "(wallets, jumbo bags)."
-    )
-else:
-    st.info("Columns 'Description'/'Quantity' not found.")
+box_product = st.container()
+box_product.subheader("Produk kategori apa yang paling diminati oleh konsumen berdasarkan banyaknya pembelian?")
 
 # ============ 3) Transactions per Hour ============
-st.subheader("Kapan pelanggan paling banyak melakukan transaksi?")
-if "Hour" in df_view.columns:
-    trx_hour = df_view.groupby("Hour").size().reindex(range(24), fill_value=0)
-
-    with sns.axes_style("white"):  # override whitegrid → tanpa grid
-        fig, ax = plt.subplots(figsize=(10, 4))
-
-        line_color = sns.color_palette("mako", 6)[4]  # ambil shade mako
-        ax.plot(
-            trx_hour.index, trx_hour.values,
-            marker="o", linewidth=2.2, markersize=5,
-            color=line_color
-        )
-
-        # hilangkan grid & rapikan spines
-        ax.grid(False)
-        for s in ["top", "right", "left"]:
-            ax.spines[s].set_visible(False)
-        ax.spines["bottom"].set_color("#E5E7EB")
-
-        ax.set_title("Transactions per Hour")
-        ax.set_xlabel("Hour"); ax.set_ylabel("Count")
-        ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
-        ax.margins(x=0.01)
-
-        # label tiap titik (tetap seperti punyamu)
-        ymax = trx_hour.values.max()
-        for x, y in zip(trx_hour.index, trx_hour.values):
-            ax.text(x, y + ymax*0.02, f"{int(y)}", ha="center", fontsize=8)
-
-        st.pyplot(fig)
-
-    # Insight
-    st.markdown(
-      "Pelanggan paling banyak melakukan transaksi pada pukul 12.00 dengan jumlah"
-      "transaksi 771 dan paling sedikit pada pukul 07.00 dengan jumlah transaksi 2."
-      "Transaksi mulai meningkat pada pukul 08:00 dan menurun tajam setelah pukul 15:00."
-      "Aktivitas sangat rendah terjadi di atas pukul 18:00.")
+box_hour = st.container()
+box_hour.subheader("Kapan pelanggan paling banyak melakukan transaksi?")
 
 # ============ 4) Monthly revenue trend (2011) ============
-st.subheader("Bagaimana tren revenue dalam 1 tahun? Pada bulan apa didapatkan revenue tertinggi dan terendah?")
-if set(["Year","Month","Month_Name"]).issubset(df_view.columns):
-    y2011_view = df_view[df_view["Year"] == 2011]
-    if not y2011_view.empty:
-        year_revenue = (
-            y2011_view.groupby(["Month","Month_Name"], as_index=False)["Revenue"].sum()
-                      .sort_values("Month")
-        )
-
-        with sns.axes_style("white"):  # tanpa grid
-            fig, ax = plt.subplots(figsize=(10, 4))
-            order = year_revenue["Month_Name"].tolist()
-
-            sns.barplot(
-                x="Month_Name", y="Revenue", data=year_revenue, ax=ax,
-                order=order,
-                palette=sns.color_palette("mako", n_colors=len(year_revenue))
-            )
-
-            # hilangkan grid & rapikan spines
-            ax.grid(False)
-            for s in ["top", "right", "left"]:
-                ax.spines[s].set_visible(False)
-            ax.spines["bottom"].set_color("#E5E7EB")
-
-            ax.set_title("Total Revenue per Month — 2011")
-            ax.set_xlabel("")
-            ax.tick_params(axis="x", rotation=45)
-            ax.yaxis.set_major_formatter(StrMethodFormatter("{x:,.0f}"))
-
-            annotate_bars(ax, fmt="{:,.0f}")
-            plt.tight_layout()
-            st.pyplot(fig)
-
-        # Insight
-        st.markdown(
-        "Revenue cenderung meningkat stabil sepanjang tahun, terutama sejak"
-        "September hingga November. Dapat diketahui total pendapatan terbesar"
-        "didapat pada Bulan November yaitu 8056, sedangkan total pendapatan"
-        "terkecil didapat pada Bulan Desember sebesar 1914. Bulan Desember"
-        "terjadi penurunan tajam dimungkinkan karena ketersediaan data yang"
-        "belum lengkap.")
-
-    else:
-        st.info("No rows for 2011 under current filters.")
-else:
-    st.info("Date columns needed for monthly trend are missing.")
+box_month = st.container()
+box_month.subheader("Bagaimana tren revenue dalam 1 tahun? Pada bulan apa didapatkan revenue tertinggi dan terendah?")
 
 # ============ Viz 5: November Drill-down ============
 st.subheader("Apa yang terjadi pada Bulan November 2011?")
-if "Month_Name" in df_locked.columns:
-    nov = df_locked[df_locked["Month_Name"] == "November"]
-    if not nov.empty and {"Description","Quantity"}.issubset(nov.columns):
-        prod_nov = (
-            nov.groupby("Description", as_index=False)["Quantity"].sum()
-               .sort_values("Quantity", ascending=False).head(10)
-        )
-
-        with sns.axes_style("white"):  # tanpa grid
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(
-                y="Description", x="Quantity", data=prod_nov, ax=ax,
-                palette=sns.color_palette("mako", n_colors=len(prod_nov))
-            )
-
-            # bersihkan grid & spines
-            ax.grid(False)
-            for s in ["top", "right", "left"]:
-                ax.spines[s].set_visible(False)
-            ax.spines["bottom"].set_color("#E5E7EB")
-
-            ax.set_title("Top Products — November")
-            ax.set_ylabel("")  # rapikan label Y
-            ax.xaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))  # format ribuan
-
-            annotate_bars(ax, fmt="{:.0f}")
-            plt.tight_layout()
-            st.pyplot(fig)
-    else:
-        st.info("No November rows after filtering or missing needed columns.")
+if "Month" in cube.columns:
+    # total produk per bulan disimpan sekali; drill-down bulan mana pun = top-K dari struktur yang sama
+    with profiler.stage("product top-k", rows_in=len(cube), cached=True):
+        product_topk = build_product_topk(data_fp, cube)
+
+    @st.fragment
+    def month_drilldown():
+        months = sorted({m for _, m in product_topk.months()})
+        if not months:
+            st.info("No rows after filtering or missing needed columns.")
+            return
+        month = st.selectbox("Bulan", months, index=months.index(11) if 11 in months else len(months) - 1,
+                             format_func=MONTH_MAP.get, key="drill_month")
+        prod_month = product_topk.top(10, month=month)
+        if not prod_month.empty:
+            show_chart("month products", plot_top_products, prod_month,
+                       title=f"Top Products — {MONTH_MAP[month]}", figsize=(10, 6), x_margin=None)
+            if "Error" in prod_month:   # mode Space-Saving (TOPK_CAPACITY)
+                st.caption(f"Approximate: Quantity bisa lebih tinggi dari aslinya maks. "
+                           f"{prod_month['Error'].max():,} per produk.")
+        else:
+            st.info(f"No {MONTH_MAP[month]} rows after filtering or missing needed columns.")
+
+    month_drilldown()
 
 # Insight
     st.markdown(
@@ -402,27 +458,26 @@ if "Month_Name" in df_locked.columns:
 
 
 # ============ 6) Correlation ============
-st.subheader("Bagaimana korelasi antara Quantity, Revenue, dan Unit Price?")
-num_cols = [c for c in ["Quantity","UnitPrice","Revenue"] if c in df_view.columns]
-if len(num_cols) >= 2:
-    corr = df_view[num_cols].corr(numeric_only=True)
-    fig, ax = plt.subplots(figsize=(6,4))
-    sns.heatmap(corr, annot=True, cmap='Blues', fmt='.2f', linewidths=0.5, ax=ax)
-    ax.set_title('Correlation Heatmap')
-    st.pyplot(fig)
-
-    # Insight
-    st.markdown(
-    "Korelasi antara Quantity dan Revenue (0.53) Terdapat korelasi positif yang"
-    "cukup kuat, menunjukkan semakin banyak jumlah barang yang dibeli (Quantity),"
-    "semakin besar pendapatan (Revenue). Korelasi antara Quantity dan UnitPrice"
-    "(-0.34) Terdapat korelasi negatif yang lemah, menunjukkan ketika jumlah barang"
-    "yang dibeli meningkat, harga unit cenderung sedikit menurun. Korelasi antara"
-    "UnitPrice dan Revenue (0.35) Korelasi positif yang lemah menunjukkan harga"
-    "unit yang lebih tinggi berkontribusi pada peningkatan pendapatan.")
-
+box_corr = st.container()
+box_corr.subheader("Bagaimana korelasi antara Quantity, Revenue, dan Unit Price?")
+
+# ============ 7) Customer segmentation (RFM) ============
+box_rfm = st.container()
+box_rfm.subheader("Bagaimana segmentasi pelanggan berdasarkan Recency, Frequency, dan Monetary (RFM)?")
+if df_locked is not None:
+    with profiler.stage("customer cube", rows_in=len(df_locked), cached=True):
+        customer_index = build_customer_index(data_fp, df_locked)
 else:
-    st.info("Not enough numerical columns for correlation.")
+    customer_index = None   # mode streaming: tidak ada baris locked per pelanggan
+
+# ============ 8) Market basket ============
+box_basket = st.container()
+box_basket.subheader("Produk apa saja yang sering dibeli bersama dalam satu invoice?")
+if df_locked is not None:
+    with profiler.stage("basket lines", rows_in=len(df_locked), cached=True):
+        basket_index = build_basket_index(data_fp, df_locked)
+else:
+    basket_index = None
 
 st.header("Business Recommendation")
 
@@ -501,3 +556,215 @@ with r2c2:
 
 st.divider()
 st.success("Thank You.")
+
+# ============ Profiling (debug) ============
+profile_box = st.container()
+if profiler.enabled:
+    profile_box.divider()   # fragment hanya bisa menulis ke container yang sudah terisi saat full run
+
+def show_profile(country_sel, d_from, d_to):
+    prof = profiler.frame()
+    with st.expander(f"Profiling (debug) — total {prof['ms'].sum():,.1f} ms", expanded=True):
+        st.dataframe(prof.style.format({"ms": "{:,.1f}", "peak_mb": "{:,.2f}"}, na_rep="–"),
+                     width="stretch", hide_index=True)
+        if df_locked is not None:
+            st.caption("Memori dataset locked: skema lama vs skema ringkas (MB)")
+            st.dataframe(memory_report(df_locked).style.format(
+                             {"mb_before": "{:,.3f}", "mb_after": "{:,.3f}", "ratio": "{:.2f}"}, na_rep="–"),
+                         width="stretch", hide_index=True)
+    if log_profile:
+        profiler.write_log(PROFILE_LOG, ts=pd.Timestamp.now().isoformat(), source=data_fp,
+                           countries=country_sel, date_from=d_from, date_to=d_to)
+
+def chart_sections(slots, ins, mode):
+    """Bagian 1–4 ke slot masing-masing; dipanggil ulang untuk mengganti preview dengan hasil exact."""
+    # ============ 1) Revenue by Country ============
+    with slots[0].container():
+        top5_view = ins["top5_view"]
+        if top5_view is not None:
+
+            show_chart("top countries", plot_top_countries, top5_view)
+            st.caption(mode)
+
+            st.markdown(
+                "Pendapatan tertinggi diperoleh di Negara United Kingdom dengan jumlah "
+                "pendapatan 44,942."
+            )
+        else:
+            st.info("Column 'Country' not found.")
+
+    # ============ 2) Top Products by Quantity ============
+    with slots[1].container():
+        top_product_view = ins["top_product_view"]
+        if top_product_view is not None:
+
+            show_chart("top products", plot_top_products, top_product_view)
+            st.caption(mode)
+
+            st.markdown(
+                "Produk dengan penjualan tertinggi yaitu 60 TEATIME FAIRY CAKE CASES yang "
+                "terjual hingga 249 buah. Barang lain yang menjadi top sales yaitu peralatan "
+                "dapur/baking (cake cases, jelly moulds, jam set), dekorasi dan seasonal items "
+                "(bunting, Christmas ornament, glass T-light), dan produk serbaguna/hadiah "
+                "(wallets, jumbo bags)."
+            )
+        else:
+            st.info("Columns 'Description'/'Quantity' not found.")
+
+    # ============ 3) Transactions per Hour ============
+    with slots[2].container():
+        trx_hour = ins["trx_hour"]
+        if trx_hour is not None:
+
+            show_chart("transactions per hour", plot_transactions_per_hour, trx_hour)
+            st.caption(mode)
+
+            # Insight
+            st.markdown(
+              "Pelanggan paling banyak melakukan transaksi pada pukul 12.00 dengan jumlah"
+              "transaksi 771 dan paling sedikit pada pukul 07.00 dengan jumlah transaksi 2."
+              "Transaksi mulai meningkat pada pukul 08:00 dan menurun tajam setelah pukul 15:00."
+              "Aktivitas sangat rendah terjadi di atas pukul 18:00.")
+
+    # ============ 4) Monthly revenue trend (2011) ============
+    with slots[3].container():
+        year_revenue = ins["year_revenue"]
+        if year_revenue is not None:
+            if not year_revenue.empty:
+
+                show_chart("monthly revenue", plot_monthly_revenue, year_revenue, year=2011)
+                st.caption(mode)
+
+                # Insight
+                st.markdown(
+                "Revenue cenderung meningkat stabil sepanjang tahun, terutama sejak"
+                "September hingga November. Dapat diketahui total pendapatan terbesar"
+                "didapat pada Bulan November yaitu 8056, sedangkan total pendapatan"
+                "terkecil didapat pada Bulan Desember sebesar 1914. Bulan Desember"
+                "terjadi penurunan tajam dimungkinkan karena ketersediaan data yang"
+                "belum lengkap.")
+
+            else:
+                st.info("No rows for 2011 under current filters.")
+        else:
+            st.info("Date columns needed for monthly trend are missing.")
+
+# ============ Bagian ber-filter (fragment) ============
+@st.fragment
+def filtered_insights():
+    """Filter + bagian 1–4 & 6; interaksi filter hanya menjalankan ulang fungsi ini."""
+    # rerun fragment: tracing memori dipegang lagi selama fragment dan dilepas di akhir (juga saat error)
+    with profiler:
+        _filtered_insights()
+
+def _filtered_insights():
+    if getattr(profiler, "fragment_done", False):
+        profiler.records = []   # rerun fragment saja: tahap full run sebelumnya tidak ikut dihitung
+    with filters_box:
+        country_sel, d_from, d_to = filter_widgets()
+
+    # ============ Apply filters ke VIEW (grafik) ============
+    # filter + agregasi di backend (pandas: FilterIndex.select pada cube; duckdb: WHERE pada Parquet)
+    slots = [box.empty() for box in (box_country, box_product, box_hour, box_month)]
+    if preview_sample is not None:
+        # preview dari sampel berstrata tampil dulu; exact dihitung di thread latar lalu menggantikannya
+        future = exact_pool().submit(backend.view_insights, country_sel, d_from, d_to, executor=insight_pool())
+        with profiler.stage("preview: filtered insights (sample)", rows_in=len(preview_sample.index.df)):
+            est = preview_sample.view_insights(country_sel, d_from, d_to)
+        chart_sections(slots, est, f"Mode: preview — sampel berstrata {preview_sample.fraction:.1%} sel cube "
+                                   "(Country × bulan), error bar = CI 95%. Hasil exact sedang dihitung…")
+        with profiler.stage("filter + agg: filtered insights (background)", rows_in=len(cube)):
+            ins = future.result()
+    else:
+        with profiler.stage("filter + agg: filtered insights", rows_in=len(cube)):
+            ins = backend.view_insights(country_sel, d_from, d_to, executor=insight_pool())
+
+    sel = ins.get("selection")
+    if sel is not None:
+        with box_selection:
+            s1, s2, s3, s4 = st.columns(4)
+            s1.metric("Rows (filter)", f"{sel['rows']:,}")
+            s2.metric("Unique Products (filter)", f"≈{sel['products']:,}" if sel["products"] is not None else "–",
+                      help="Estimasi HyperLogLog (error ~1.6%)")
+            s3.metric("Countries (filter)", f"{sel['countries']:,}" if sel["countries"] is not None else "–")
+            s4.metric("Revenue (filter)", f"{sel['revenue']:,.2f}")
+
+    chart_sections(slots, ins, "Mode: exact")
+
+    # ============ 6) Correlation ============
+    with box_corr:
+        corr = ins["corr"]
+        if corr is not None and corr.empty:
+            st.info("No rows match the current filters.")
+        elif corr is not None:
+            show_chart("correlation", plot_correlation, corr)
+
+            # Insight
+            st.markdown(
+            "Korelasi antara Quantity dan Revenue (0.53) Terdapat korelasi positif yang"
+            "cukup kuat, menunjukkan semakin banyak jumlah barang yang dibeli (Quantity),"
+            "semakin besar pendapatan (Revenue). Korelasi antara Quantity dan UnitPrice"
+            "(-0.34) Terdapat korelasi negatif yang lemah, menunjukkan ketika jumlah barang"
+            "yang dibeli meningkat, harga unit cenderung sedikit menurun. Korelasi antara"
+            "UnitPrice dan Revenue (0.35) Korelasi positif yang lemah menunjukkan harga"
+            "unit yang lebih tinggi berkontribusi pada peningkatan pendapatan.")
+
+        else:
+            st.info("Not enough numerical columns for correlation.")
+
+    # ============ 7) RFM ============
+    with box_rfm:
+        if customer_index is None:
+            st.info("RFM needs CustomerID, InvoiceNo, InvoiceDate & Revenue rows (not available in streaming mode).")
+        else:
+            with profiler.stage("filter + agg: rfm", rows_in=len(customer_index.df)) as stg:
+                rfm = customer_rfm(customer_index.select(country_sel, d_from, d_to), executor=insight_pool())
+                stg.rows_out = 0 if rfm is None else len(rfm)
+            if rfm is not None:
+                segments = rfm_segments(rfm)
+                show_chart("rfm segments", plot_rfm_segments, segments)
+                st.dataframe(segments.style.format({"Share": "{:.1%}", "Recency": "{:,.0f} hari",
+                                                    "Frequency": "{:,.2f}", "Monetary": "{:,.2f}",
+                                                    "Revenue": "{:,.2f}"}),
+                             width="stretch", hide_index=True)
+                st.download_button("Download RFM per customer (CSV)", lambda: rfm.to_csv(index=False),
+                                   file_name="rfm_customers.csv", mime="text/csv", on_click="ignore")
+                st.markdown(
+                "Skor R, F, M (1–5) adalah kuantil pelanggan pada filter aktif; Recency dihitung"
+                " sampai sehari setelah transaksi terakhir. Champions & Loyal Customers cocok untuk"
+                " program loyalitas, sedangkan At Risk & Can't Lose perlu kampanye win-back.")
+            else:
+                st.info("No customers for the selected filters.")
+
+    # ============ 8) Market basket ============
+    with box_basket:
+        if basket_index is None:
+            st.info("Market basket needs InvoiceNo & Description rows (not available in streaming mode).")
+        else:
+            min_support = st.slider("Minimum support (% invoice)", 0.0, 5.0, 0.1, step=0.05,
+                                    key="basket_min_support") / 100
+            with profiler.stage("filter + agg: basket", rows_in=len(basket_index.df)) as stg:
+                pairs = basket_pairs(basket_index.select(country_sel, d_from, d_to), min_support=min_support)
+                stg.rows_out = 0 if pairs is None else len(pairs)
+            bundles = top_bundles(pairs)
+            if bundles is not None and not bundles.empty:
+                show_chart("bundles", plot_top_bundles, bundles)
+                st.dataframe(bundles.style.format({"Support": "{:.2%}", "Confidence A→B": "{:.1%}",
+                                                   "Confidence B→A": "{:.1%}", "Lift": "{:.2f}"}),
+                             width="stretch", hide_index=True)
+                st.markdown(
+                "Lift > 1 berarti dua produk lebih sering dibeli bersama daripada kebetulan;"
+                " confidence A→B adalah porsi invoice berisi A yang juga berisi B. Pasangan"
+                " teratas adalah kandidat bundle dan rekomendasi \"sering dibeli bersama\".")
+            else:
+                threshold = pairs.attrs["threshold"] if pairs is not None else "–"
+                st.info(f"No product pair with lift > 1 appears in at least {threshold} invoices "
+                        "for the selected filters; try a lower minimum support.")
+
+    if profiler.enabled:
+        with profile_box:
+            show_profile(country_sel, d_from, d_to)
+    profiler.fragment_done = True
+
+filtered_insights()
+profiler.close()   # akhir run: tracing tidak ikut hidup sampai GC menemukan siklus referensi
@@ -0,0 +1,140 @@
+"""Tes regresi eda_core (pytest). Data sintetis dari eda_bench.generate_transactions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from eda_bench import generate_transactions
+from eda_core import (CUBE_KEYS, CUBE_MEASURES, FilterIndex, LockedStore, PartitionStats, StratifiedSample, build_cube, build_customer_cube, clean_and_lock,
+                      customer_rfm, view_insights)
+
+
+@pytest.fixture
+def raw():
+    return generate_transactions(3000, seed=1)
+
+
+@pytest.fixture
+def missing_keys_locked():
+    # Country kosong & tanggal yang tidak bisa di-parse -> kunci NaN di cube
+    raw = generate_transactions(20000, seed=2)
+    rng = np.random.default_rng(0)
+    raw.loc[rng.random(len(raw)) < 0.02, "Country"] = None
+    raw.loc[rng.random(len(raw)) < 0.02, "InvoiceDate"] = "not a date"
+    return clean_and_lock(raw)
+
+
+@pytest.fixture
+def missing_keys_cube(missing_keys_locked):
+    cube = build_cube(missing_keys_locked)
+    assert cube["Country"].isna().any() and cube["Date"].isna().any()
+    return cube
+
+
+def test_store_reads_after_fractional_quantity_batch(tmp_path, raw):
+    store = LockedStore.create(str(tmp_path / "store"), raw.iloc[:2000])
+    batch = raw.iloc[2000:].copy()
+    batch["Quantity"] = batch["Quantity"].astype(float)
+    batch.iloc[0, batch.columns.get_loc("Quantity")] = 2.5
+    store.append(batch)
+
+    locked = LockedStore(str(tmp_path / "store")).locked()
+    assert 2.5 in set(locked["Quantity"])
+    assert len(locked) > 0
+    assert int(store.cube()["Count"].sum()) == len(locked)
+
+
+def test_group_append_reads_only_moved_groups(tmp_path):
+    raw = generate_transactions(8000, seed=3)
+    store = LockedStore.create(str(tmp_path / "store"), raw.iloc[:2000], outlier_by={"UnitPrice": "StockCode"})
+    history = 2000
+    for start in (2000, 4000, 6000):
+        summary = store.append(raw.iloc[start:start + 2000])
+        assert summary["scanned_rows"] < 0.05 * history
+        history += 2000
+
+    # cube incremental tetap sama dengan cube dari seluruh baris locked
+    full = build_cube(store.locked())
+    merged = full.merge(store.cube(), on=CUBE_KEYS, how="outer", suffixes=("", "_store"))
+    assert len(merged) == len(full)
+    assert np.allclose(merged["Count"], merged["Count_store"])
+    assert np.allclose(merged["Revenue"], merged["Revenue_store"], atol=1e-3)
+
+
+def test_store_from_csv_chunks_matches_create(tmp_path, raw):
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+    whole = LockedStore.create(str(tmp_path / "whole"), raw)
+    chunked = LockedStore.from_csv(str(tmp_path / "chunked"), str(path), memory_mb=0.1)
+    assert chunked.state["parts"] > 1
+    assert chunked.raw_shape() == whole.raw_shape()
+
+    merged = whole.cube().merge(chunked.cube(), on=CUBE_KEYS, how="outer", suffixes=("", "_chunked"))
+    assert len(merged) == len(whole.cube())
+    assert np.allclose(merged["Count"], merged["Count_chunked"])
+    assert np.allclose(merged["Revenue"], merged["Revenue_chunked"], atol=1e-3)
+
+
+def test_full_fraction_preview_equals_exact(missing_keys_cube):
+    est = StratifiedSample(missing_keys_cube, fraction=1.0).view_insights()
+    exact = view_insights(missing_keys_cube)
+    for name, key, value in [("top5_view", "Country", "Revenue"), ("top_product_view", "Description", "Quantity"),
+                             ("year_revenue", "Month", "Revenue")]:
+        a, b = est[name].set_index(key)[value], exact[name].set_index(key)[value]
+        assert list(a.index) == list(b.index), name
+        assert np.allclose(a, b), name
+    assert np.allclose(est["trx_hour"]["Count"].reindex(exact["trx_hour"].index), exact["trx_hour"])
+
+
+def test_rfm_equal_inputs_get_equal_segments():
+    # 60 pelanggan, banyak yang identik: Frequency = 1 & tanggal terakhir yang sama
+    rng = np.random.default_rng(4)
+    n = 60
+    cells = pd.DataFrame({"CustomerID": np.arange(n) + 10000,
+                          "Date": pd.Timestamp("2011-12-01") - pd.to_timedelta(rng.integers(0, 4, n) * 30, unit="D"),
+                          "Country": "United Kingdom", "Invoices": np.where(rng.random(n) < 0.6, 1, rng.integers(2, 4, n)),
+                          "Revenue": rng.choice([10.0, 25.0, 50.0], n)})
+    cells["LastInvoice"] = cells["Date"]
+    rfm = customer_rfm(cells)
+    assert rfm.duplicated(["Recency", "Frequency", "Monetary"]).any()
+    for cols, score in ((["Recency"], "R"), (["Frequency"], "F"), (["Monetary"], "M"),
+                        (["Recency", "Frequency"], "Segment")):
+        assert (rfm.groupby(cols)[score].nunique() == 1).all(), score
+
+
+def test_customer_cube_accepts_string_ids(raw):
+    locked = clean_and_lock(raw)
+    numeric = customer_rfm(build_customer_cube(locked))
+    locked["CustomerID"] = ("C" + locked["CustomerID"].astype("Int64").astype(str)).where(locked["CustomerID"].notna())
+    text = customer_rfm(build_customer_cube(locked))
+    assert len(text) == len(numeric)
+    assert list(text["Segment"].astype(str)) == list(numeric["Segment"].astype(str))
+
+
+@pytest.mark.parametrize("source", ["locked", "cube"])
+def test_unfiltered_partition_stats_keep_missing_keys(source, missing_keys_locked, missing_keys_cube):
+    stats = PartitionStats(missing_keys_locked if source == "locked" else missing_keys_cube)
+    overview = stats.overview()
+    assert overview["rows"] == int(missing_keys_cube["Count"].sum()) == len(missing_keys_locked)
+    assert np.isclose(overview["revenue"], missing_keys_cube["Revenue"].sum())
+    assert np.allclose(stats.correlation(), missing_keys_locked[CUBE_MEASURES].corr())
+
+    # filter tanggal/negara membuang baris yang kuncinya kosong
+    known = missing_keys_locked[missing_keys_locked["Country"].notna()]
+    countries = sorted(known["Country"].astype(str).unique())
+    assert stats.overview(countries=countries)["rows"] == len(known)
+    d_from, d_to = missing_keys_locked["InvoiceDate"].min().normalize(), missing_keys_locked["InvoiceDate"].max()
+    assert stats.overview(d_from=d_from, d_to=d_to)["rows"] == int(missing_keys_locked["InvoiceDate"].notna().sum())
+
+
+def test_filter_index_country_date_select_matches_mask(missing_keys_locked):
+    index = FilterIndex(missing_keys_locked)
+    rows, dates = index.df, index.df["InvoiceDate"]
+    d_from, d_to = pd.Timestamp("2011-03-01"), pd.Timestamp("2011-05-31")
+    in_range = (dates >= d_from) & (dates < d_to + pd.Timedelta(days=1))
+    for countries in (["United Kingdom"], ["Germany", "United Kingdom"], ["France", "Nope"]):
+        expected = rows[in_range & rows["Country"].isin(countries)]
+        got = index.select(countries, d_from.date(), d_to.date())
+        assert got.sort_index().equals(expected)
+    # satu negara (dominan sekalipun) = slice blok, bukan salinan
+    uk = index.select(["United Kingdom"], d_from.date(), d_to.date())
+    assert np.shares_memory(uk["Revenue"].to_numpy(), index.by_country["Revenue"].to_numpy())